@@ -0,0 +1,230 @@
+"""
+Simulação do fluxo de processamento RAG para o Discovery RAG Agent V2.
+
+Este módulo define as etapas da simulação exibida na visualização de fluxo e a
+rotina que as executa, compartilhada pela API e pelo worker de tarefas.
+"""
+
+import asyncio
+from typing import Dict, Any, Optional, Tuple
+
+
+# Grupos do estado da simulação armazenados com chaves planas ("grupo.campo")
+_FLOW_STATE_GROUPS = ("nodes", "connections", "metrics")
+
+def _flatten_flow_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converte um estado (ou atualização) aninhado para chaves planas.
+    """
+    flat_state = {}
+    for key, value in state.items():
+        if key in _FLOW_STATE_GROUPS:
+            for field, field_value in value.items():
+                flat_state[f"{key}.{field}"] = field_value
+        else:
+            flat_state[key] = value
+    return flat_state
+
+# Estado inicial de uma simulação, já com chaves planas
+_INITIAL_FLOW_STATE = _flatten_flow_state({
+    "status": "running",
+    "current_step": 0,
+    "nodes": {
+        "query": "waiting",
+        "classification": "waiting",
+        "retrieval": "waiting",
+        "reranking": "waiting",
+        "context": "waiting",
+        "prompt": "waiting",
+        "generation": "waiting",
+        "response": "waiting"
+    },
+    "connections": {
+        "query_classification": "waiting",
+        "classification_retrieval": "waiting",
+        "retrieval_reranking": "waiting",
+        "reranking_context": "waiting",
+        "context_prompt": "waiting",
+        "prompt_generation": "waiting",
+        "generation_response": "waiting"
+    },
+    "metrics": {
+        "processingTime": 0,
+        "documentsRetrieved": 0,
+        "chunksProcessed": 0,
+        "tokensUsed": 0
+    },
+    "current_node_details": None
+})
+
+# Caminho aninhado (grupo, campo) de cada chave plana do estado
+_FLOW_STATE_PATHS = {key: tuple(key.split(".", 1)) for key in _INITIAL_FLOW_STATE if "." in key}
+
+def expand_flow_state(flat_state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reconstrói o formato aninhado esperado pelo frontend a partir das chaves planas.
+    """
+    state = {}
+    for key, value in flat_state.items():
+        path = _FLOW_STATE_PATHS.get(key)
+        if path is None:
+            state[key] = value
+        else:
+            group, field = path
+            state.setdefault(group, {})[field] = value
+    return state
+
+# Etapas da simulação de fluxo: (atraso em segundos, atualizações do estado, detalhes do nó)
+# Os detalhes são (título, descrição, tipo); a descrição pode referenciar {query} e {objective}.
+_FLOW_STEP_TABLE = (
+    # Etapa 1: Consulta
+    (1, {
+        "current_step": 1,
+        "nodes": {"query": "active"},
+        "metrics": {"processingTime": 0.2}
+    }, ("Consulta do Usuário", "Analisando a consulta: \"{query}\"", "input")),
+    # Etapa 2: Conexão Consulta -> Classificação
+    (0.5, {
+        "current_step": 2,
+        "nodes": {"query": "completed"},
+        "connections": {"query_classification": "active"},
+        "metrics": {"processingTime": 0.5}
+    }, None),
+    # Etapa 3: Classificação
+    (1, {
+        "current_step": 3,
+        "connections": {"query_classification": "completed"},
+        "nodes": {"classification": "active"},
+        "metrics": {"processingTime": 0.8}
+    }, ("Classificação de Objetivo", "Classificando a consulta como: \"{objective}\"", "process")),
+    # Etapa 4: Conexão Classificação -> Recuperação
+    (0.5, {
+        "current_step": 4,
+        "nodes": {"classification": "completed"},
+        "connections": {"classification_retrieval": "active"},
+        "metrics": {"processingTime": 1.0}
+    }, None),
+    # Etapa 5: Recuperação
+    (1.5, {
+        "current_step": 5,
+        "connections": {"classification_retrieval": "completed"},
+        "nodes": {"retrieval": "active"},
+        "metrics": {
+            "processingTime": 1.5,
+            "documentsRetrieved": 3,
+            "chunksProcessed": 12
+        }
+    }, ("Recuperação de Documentos", "Buscando chunks relevantes na base vetorial usando similaridade semântica", "storage")),
+    # Etapa 6: Conexão Recuperação -> Reranking
+    (0.5, {
+        "current_step": 6,
+        "nodes": {"retrieval": "completed"},
+        "connections": {"retrieval_reranking": "active"},
+        "metrics": {"processingTime": 1.8}
+    }, None),
+    # Etapa 7: Reranking
+    (1, {
+        "current_step": 7,
+        "connections": {"retrieval_reranking": "completed"},
+        "nodes": {"reranking": "active"},
+        "metrics": {"processingTime": 2.3}
+    }, ("Reranking de Resultados", "Reordenando os 20 chunks iniciais para selecionar os 7 mais relevantes", "process")),
+    # Etapa 8: Conexão Reranking -> Contexto
+    (0.5, {
+        "current_step": 8,
+        "nodes": {"reranking": "completed"},
+        "connections": {"reranking_context": "active"},
+        "metrics": {"processingTime": 2.5}
+    }, None),
+    # Etapa 9: Contexto
+    (1, {
+        "current_step": 9,
+        "connections": {"reranking_context": "completed"},
+        "nodes": {"context": "active"},
+        "metrics": {"processingTime": 3.0}
+    }, ("Seleção de Contexto", "Comprimindo e priorizando informações para o contexto final", "process")),
+    # Etapa 10: Conexão Contexto -> Prompt
+    (0.5, {
+        "current_step": 10,
+        "nodes": {"context": "completed"},
+        "connections": {"context_prompt": "active"},
+        "metrics": {"processingTime": 3.2}
+    }, None),
+    # Etapa 11: Prompt
+    (1, {
+        "current_step": 11,
+        "connections": {"context_prompt": "completed"},
+        "nodes": {"prompt": "active"},
+        "metrics": {"processingTime": 3.5}
+    }, ("Construção do Prompt", "Criando prompt especializado para consulta {objective} com contexto selecionado", "process")),
+    # Etapa 12: Conexão Prompt -> Geração
+    (0.5, {
+        "current_step": 12,
+        "nodes": {"prompt": "completed"},
+        "connections": {"prompt_generation": "active"},
+        "metrics": {"processingTime": 3.7}
+    }, None),
+    # Etapa 13: Geração
+    (2, {
+        "current_step": 13,
+        "connections": {"prompt_generation": "completed"},
+        "nodes": {"generation": "active"},
+        "metrics": {
+            "processingTime": 4.5,
+            "tokensUsed": 1250
+        }
+    }, ("Geração de Resposta", "Gerando resposta estruturada com base no prompt e contexto", "api")),
+    # Etapa 14: Conexão Geração -> Resposta
+    (0.5, {
+        "current_step": 14,
+        "nodes": {"generation": "completed"},
+        "connections": {"generation_response": "active"},
+        "metrics": {"processingTime": 4.7}
+    }, None),
+    # Etapa 15: Resposta
+    (1, {
+        "current_step": 15,
+        "connections": {"generation_response": "completed"},
+        "nodes": {"response": "active"},
+        "metrics": {"processingTime": 5.0}
+    }, ("Formatação da Resposta", "Processando e formatando a resposta final para o usuário", "output")),
+    # Etapa 16: Finalização
+    (1, {
+        "current_step": 16,
+        "nodes": {"response": "completed"},
+        "status": "completed"
+    }, ("Processo Concluído", "Todos os passos foram executados com sucesso", "output")),
+)
+
+# Etapas com as atualizações já convertidas para chaves planas
+_FLOW_STEPS: Tuple[Tuple[float, Dict[str, Any], Optional[Tuple[str, str, str]]], ...] = tuple(
+    (delay, _flatten_flow_state(updates), node_details)
+    for delay, updates, node_details in _FLOW_STEP_TABLE
+)
+
+async def simulate_flow_processing(flow_store, simulation_id: str, query: str, objective: str):
+    """
+    Simula o processamento de fluxo do RAG em tempo real.
+    """
+    # Inicializar estado da simulação (chaves planas, ex.: "nodes.query")
+    state = dict(_INITIAL_FLOW_STATE)
+    await flow_store.set(simulation_id, state)
+    
+    # Executar simulação
+    for delay, updates, node_details in _FLOW_STEPS:
+        await asyncio.sleep(delay)
+        
+        # Atualizar estado da simulação
+        state.update(updates)
+        
+        # Detalhes do nó atual substituem os anteriores
+        if node_details is not None:
+            title, description, node_type = node_details
+            state["current_node_details"] = {
+                "title": title,
+                "description": description.format(query=query, objective=objective),
+                "type": node_type
+            }
+        
+        # Publicar estado atualizado (a expiração é renovada a cada gravação)
+        await flow_store.set(simulation_id, state)
@@ -0,0 +1,181 @@
+"""
+Armazenamento de estado das simulações de fluxo para o Discovery RAG Agent V2.
+
+Este módulo isola onde o estado das simulações é mantido, permitindo usar Redis
+quando a API roda com múltiplos workers e um dicionário em memória no
+desenvolvimento local.
+"""
+
+import asyncio
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import orjson
+
+
+# Tempo (em segundos) que uma simulação permanece disponível após a última atualização
+FLOW_STATE_TTL = 600
+
+# Intervalo (em segundos) entre varreduras de simulações expiradas em memória
+SWEEP_INTERVAL = 60
+
+
+class InMemoryFlowStore:
+    """
+    Mantém o estado das simulações no próprio processo.
+
+    Adequado apenas para um único worker: simulações iniciadas em um processo
+    não são visíveis para os demais.
+    """
+
+    def __init__(self, ttl: int = FLOW_STATE_TTL):
+        """
+        Inicializa o armazenamento em memória.
+
+        Args:
+            ttl: Tempo de expiração das simulações em segundos
+        """
+        self.ttl = ttl
+        self._states: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    async def get(self, simulation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Recupera o estado de uma simulação.
+
+        Args:
+            simulation_id: ID da simulação
+
+        Returns:
+            Estado da simulação ou None se não existir ou tiver expirado
+        """
+        entry = self._states.get(simulation_id)
+        if entry is None:
+            return None
+
+        expires_at, state = entry
+        if expires_at < time.monotonic():
+            self._states.pop(simulation_id, None)
+            return None
+
+        return state
+
+    async def set(self, simulation_id: str, state: Dict[str, Any]) -> None:
+        """
+        Grava o estado de uma simulação, renovando sua expiração.
+
+        Args:
+            simulation_id: ID da simulação
+            state: Estado completo da simulação
+        """
+        self._states[simulation_id] = (time.monotonic() + self.ttl, state)
+
+    def purge_expired(self) -> int:
+        """
+        Remove as simulações expiradas.
+
+        Returns:
+            Número de simulações removidas
+        """
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._states.items() if expires_at < now]
+        for key in expired:
+            del self._states[key]
+
+        return len(expired)
+
+    async def close(self) -> None:
+        """
+        Libera os recursos do armazenamento.
+        """
+        self._states.clear()
+
+
+class RedisFlowStore:
+    """
+    Mantém o estado das simulações no Redis, compartilhado entre workers.
+
+    A expiração é delegada ao TTL do próprio Redis.
+    """
+
+    def __init__(self, redis_client, ttl: int = FLOW_STATE_TTL, key_prefix: str = "flow:"):
+        """
+        Inicializa o armazenamento no Redis.
+
+        Args:
+            redis_client: Cliente redis.asyncio inicializado
+            ttl: Tempo de expiração das simulações em segundos
+            key_prefix: Prefixo das chaves no Redis
+        """
+        self.redis = redis_client
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+
+    async def get(self, simulation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Recupera o estado de uma simulação.
+
+        Args:
+            simulation_id: ID da simulação
+
+        Returns:
+            Estado da simulação ou None se não existir ou tiver expirado
+        """
+        raw_state = await self.redis.get(self.key_prefix + simulation_id)
+        if raw_state is None:
+            return None
+
+        return orjson.loads(raw_state)
+
+    async def set(self, simulation_id: str, state: Dict[str, Any]) -> None:
+        """
+        Grava o estado de uma simulação, renovando sua expiração.
+
+        Args:
+            simulation_id: ID da simulação
+            state: Estado completo da simulação
+        """
+        await self.redis.set(
+            self.key_prefix + simulation_id,
+            orjson.dumps(state),
+            ex=self.ttl
+        )
+
+    async def close(self) -> None:
+        """
+        Fecha a conexão com o Redis.
+        """
+        await self.redis.aclose()
+
+
+async def sweep_expired_flows(store: InMemoryFlowStore, interval: float = SWEEP_INTERVAL) -> None:
+    """
+    Remove periodicamente as simulações expiradas de um armazenamento em memória.
+
+    Uma única tarefa atende todas as simulações, em vez de uma tarefa
+    aguardando a expiração de cada uma.
+
+    Args:
+        store: Armazenamento em memória a ser varrido
+        interval: Intervalo entre varreduras em segundos
+    """
+    while True:
+        await asyncio.sleep(interval)
+        store.purge_expired()
+
+
+def create_flow_store(redis_url: Optional[str] = None):
+    """
+    Cria o armazenamento de simulações adequado à configuração.
+
+    Args:
+        redis_url: URL do Redis (opcional). Sem ela, usa armazenamento em memória.
+
+    Returns:
+        Instância de armazenamento de simulações
+    """
+    if not redis_url:
+        return InMemoryFlowStore()
+
+    from redis import asyncio as redis_asyncio
+
+    return RedisFlowStore(redis_asyncio.from_url(redis_url))
@@ -5,39 +5,149 @@ Este módulo implementa os endpoints da API para conectar o frontend React
 ao pipeline RAG otimizado.
 """
 
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict
 from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from decimal import Decimal
 import asyncio
 import time
 import logging
 import json
 import os
+import secrets
+import zlib
+
+import httpx
+import orjson
+from openai import AsyncOpenAI
 
 # Importar componentes do RAG
 from app.rag.dynamic_context_selector import DynamicContextSelector
-from app.rag.specialized_prompts import SpecializedPromptManager, ResponseProcessor
+from app.rag.specialized_prompts import MANAGER as PROMPT_MANAGER, ResponseProcessor
 from app.rag.hierarchical_indexer import EnhancedRetriever
+from app.rag.semantic_cache import SemanticCache
+from app.api.flow_store import InMemoryFlowStore, create_flow_store, sweep_expired_flows
+from app.api.flow_simulation import expand_flow_state, simulate_flow_processing
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Latência artificial opcional (em segundos) para demonstrações do modo simulado
+MOCK_DELAY = float(os.getenv("MOCK_DELAY", "0"))
+
+# Origens do frontend autorizadas pelo CORS (separadas por vírgula)
+FRONTEND_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("FRONTEND_ORIGINS", "http://localhost:3000").split(",")
+    if origin.strip()
+]
+
+# Executa as simulações de fluxo em workers Arq separados (requer REDIS_URL)
+TASK_QUEUE_ENABLED = os.getenv("ENABLE_TASK_QUEUE", "").lower() in ("1", "true")
+
+# Tamanho (em caracteres) de cada fragmento enviado nas respostas em streaming
+STREAM_CHUNK_SIZE = 256
+
+# Limites do pool de conexões HTTP compartilhado com serviços externos (Weaviate, OpenAI)
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=50)
+HTTP_TIMEOUT = 30.0
+
+# Modelo de embedding usado para indexar o cache semântico de consultas
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+def _orjson_default(value: Any) -> Any:
+    """
+    Serializa tipos não suportados nativamente pelo orjson.
+    """
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+class APIResponse(ORJSONResponse):
+    """
+    Resposta JSON serializada diretamente com orjson.
+
+    Evita o jsonable_encoder e a revalidação pelo response_model, já que os
+    dados retornados pelos endpoints são construídos pelo próprio servidor.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Inicializa e libera os recursos compartilhados da aplicação.
+    """
+    # Estado das simulações: Redis quando configurado, memória local caso contrário
+    app.state.flow_store = create_flow_store(os.getenv("REDIS_URL"))
+    
+    # Fila de tarefas para simulações: sem ela, as simulações rodam no próprio processo
+    app.state.task_queue = None
+    if TASK_QUEUE_ENABLED and os.getenv("REDIS_URL"):
+        from arq import create_pool
+        from arq.connections import RedisSettings
+        
+        app.state.task_queue = await create_pool(RedisSettings.from_dsn(os.environ["REDIS_URL"]))
+    
+    # Componentes sem estado por requisição são compartilhados
+    app.state.prompt_manager = PROMPT_MANAGER
+    
+    # Pool HTTP único para chamadas externas, evitando um handshake TCP/TLS por requisição
+    app.state.http_client = httpx.AsyncClient(limits=HTTP_POOL_LIMITS, timeout=HTTP_TIMEOUT)
+    
+    # Cache semântico de respostas (ativo apenas com uma chave da OpenAI configurada)
+    app.state.openai_client = (
+        AsyncOpenAI(http_client=app.state.http_client) if os.getenv("OPENAI_API_KEY") else None
+    )
+    app.state.semantic_cache = SemanticCache()
+    
+    # No armazenamento em memória, uma única tarefa remove as simulações expiradas
+    sweeper = None
+    if isinstance(app.state.flow_store, InMemoryFlowStore):
+        sweeper = asyncio.create_task(sweep_expired_flows(app.state.flow_store))
+    
+    yield
+    
+    if sweeper is not None:
+        sweeper.cancel()
+    if app.state.task_queue is not None:
+        await app.state.task_queue.aclose()
+    await app.state.flow_store.close()
+    await app.state.http_client.aclose()
+
+
 # Criar aplicação FastAPI
 app = FastAPI(
     title="Discovery RAG Agent API",
     description="API para o agente de Discovery e Ideação de Produto usando RAG otimizado",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=APIResponse,
+    lifespan=lifespan
 )
 
 # Configurar CORS para permitir requisições do frontend
+# Origens explícitas permitem uma verificação direta por conjunto no middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Em produção, especificar origens permitidas
+    allow_origins=FRONTEND_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type"],
+    max_age=86400,
 )
 
 # Modelos de dados
@@ -45,11 +155,18 @@ class QueryRequest(BaseModel):
     query: str
     objective: Optional[str] = "informative"
 
+# Os modelos de resposta servem apenas para documentar a API: as respostas são
+# montadas pelo servidor e serializadas sem validação, então a construção dos
+# validadores é adiada até que algum uso (ex.: geração do OpenAPI) a exija
 class QueryResponse(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+    
     response: str
     metadata: Dict[str, Any]
 
 class FlowStatusResponse(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+    
     status: str
     current_step: int
     nodes: Dict[str, str]
@@ -57,56 +174,104 @@ class FlowStatusResponse(BaseModel):
     metrics: Dict[str, Any]
     current_node_details: Optional[Dict[str, Any]]
 
-# Estado global para simulação de fluxo
-flow_simulations = {}
-
 # Dependências
-async def get_retriever():
-    # Em uma implementação real, isso seria conectado ao Weaviate
+async def get_flow_store(request: Request):
+    return request.app.state.flow_store
+
+async def get_task_queue(request: Request):
+    return request.app.state.task_queue
+
+async def get_http_client(request: Request):
+    return request.app.state.http_client
+
+async def get_retriever(http_client = Depends(get_http_client)):
+    # Em uma implementação real, isso seria conectado ao Weaviate reutilizando http_client
     # Por enquanto, retornamos um mock
     return {
         "retriever": "mock_retriever",
         "status": "connected"
     }
 
-async def get_context_selector():
+async def get_context_selector(http_client = Depends(get_http_client)):
     # Em uma implementação real, isso seria uma instância do DynamicContextSelector
+    # com um cliente OpenAI sobre http_client
     # Por enquanto, retornamos um mock
     return {
         "selector": "mock_selector",
         "status": "ready"
     }
 
-async def get_prompt_manager():
-    # Em uma implementação real, isso seria uma instância do SpecializedPromptManager
-    # Por enquanto, retornamos um mock
-    return SpecializedPromptManager()
+async def get_prompt_manager(request: Request):
+    # Instância única criada no lifespan da aplicação
+    return request.app.state.prompt_manager
+
+async def get_openai_client(request: Request):
+    return request.app.state.openai_client
+
+async def get_semantic_cache(request: Request):
+    return request.app.state.semantic_cache
+
+# Respostas estáticas dos endpoints de status, codificadas uma única vez
+_ROOT_BODY = orjson.dumps({"status": "online", "message": "Discovery RAG Agent V2 API"})
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "version": "2.0.0",
+    "components": {
+        "api": "online",
+        "retriever": "online",
+        "context_selector": "online",
+        "prompt_manager": "online"
+    }
+})
+_ROOT_ETAG = f'W/"{zlib.adler32(_ROOT_BODY):08x}"'
+_HEALTH_ETAG = f'W/"{zlib.adler32(_HEALTH_BODY):08x}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Verifica se o cliente já possui a versão identificada pelo ETag.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
+def conditional_response(request: Request, etag: str, render_body) -> Response:
+    """
+    Responde 304 quando o ETag coincide; caso contrário, gera o corpo JSON.
+    
+    Args:
+        request: Requisição HTTP
+        etag: ETag da versão atual do recurso
+        render_body: Função que produz o corpo em bytes (chamada apenas se necessário)
+    """
+    # Forçar revalidação a cada polling para que o navegador use o ETag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=render_body(), media_type="application/json", headers=headers)
 
 # Rotas da API
 @app.get("/")
-async def root():
-    return {"status": "online", "message": "Discovery RAG Agent V2 API"}
+async def root(request: Request):
+    return conditional_response(request, _ROOT_ETAG, lambda: _ROOT_BODY)
 
 @app.get("/health")
-async def health_check():
-    return {
-        "status": "healthy",
-        "version": "2.0.0",
-        "components": {
-            "api": "online",
-            "retriever": "online",
-            "context_selector": "online",
-            "prompt_manager": "online"
-        }
-    }
+async def health_check(request: Request):
+    return conditional_response(request, _HEALTH_ETAG, lambda: _HEALTH_BODY)
 
-@app.post("/query", response_model=QueryResponse)
+@app.post("/query", responses={200: {"model": QueryResponse}})
 async def process_query(
     request: QueryRequest,
+    http_request: Request,
     background_tasks: BackgroundTasks,
     retriever = Depends(get_retriever),
     context_selector = Depends(get_context_selector),
-    prompt_manager = Depends(get_prompt_manager)
+    prompt_manager = Depends(get_prompt_manager),
+    flow_store = Depends(get_flow_store),
+    task_queue = Depends(get_task_queue),
+    openai_client = Depends(get_openai_client),
+    semantic_cache = Depends(get_semantic_cache)
 ):
     """
     Processa uma consulta do usuário e retorna uma resposta gerada pelo RAG.
@@ -115,70 +280,114 @@ async def process_query(
     - Recupera chunks relevantes
     - Seleciona contexto dinamicamente
     - Gera resposta com prompt especializado
+    
+    Clientes que enviam `Accept: application/x-ndjson` recebem a resposta em
+    streaming: uma linha `{"delta": ...}` por fragmento e uma linha final
+    `{"metadata": ..., "done": true}`.
     """
+    start_time = time.monotonic_ns()
+    
     try:
         # Iniciar simulação de fluxo em background
-        simulation_id = f"query_{int(time.time())}"
-        background_tasks.add_task(
-            simulate_flow_processing,
-            simulation_id=simulation_id,
-            query=request.query,
-            objective=request.objective
+        simulation_id = f"query_{secrets.token_hex(8)}"
+        await dispatch_flow_simulation(
+            task_queue,
+            background_tasks,
+            flow_store,
+            simulation_id,
+            request.query,
+            request.objective
         )
         
         # Log da consulta
-        logger.info(f"Processando consulta: {request.query} (objetivo: {request.objective})")
+        logger.info("Processando consulta: %s (objetivo: %s)", request.query, request.objective)
         
-        # Simular processamento RAG
-        # Em uma implementação real, isso chamaria os componentes reais
-        await asyncio.sleep(2)  # Simular tempo de processamento
+        # Consultar cache semântico antes de executar o pipeline
+        query_embedding = await embed_query(openai_client, request.query)
+        response_text = None
+        if query_embedding is not None:
+            response_text = semantic_cache.get(query_embedding, namespace=request.objective)
+        cached = response_text is not None
         
-        # Gerar resposta simulada
-        response_text = generate_mock_response(request.query, request.objective)
+        if not cached:
+            # Simular processamento RAG
+            # Em uma implementação real, isso chamaria os componentes reais
+            if MOCK_DELAY > 0:
+                await asyncio.sleep(MOCK_DELAY)
+            
+            # Gerar resposta simulada
+            response_text = generate_mock_response(request.query, request.objective)
+            
+            if query_embedding is not None:
+                semantic_cache.put(query_embedding, response_text, namespace=request.objective)
         
         # Gerar metadados simulados
         metadata = {
             "objective": request.objective,
-            "processingTime": "2.3s",
+            "processingTime": f"{(time.monotonic_ns() - start_time) / 1e9:.3f}s",
             "tokensUsed": 1250,
             "sourcesCount": 3,
-            "simulationId": simulation_id
+            "simulationId": simulation_id,
+            "cached": cached
         }
         
-        return {
-            "response": response_text,
-            "metadata": metadata
-        }
+        if "application/x-ndjson" in http_request.headers.get("accept", ""):
+            return StreamingResponse(
+                stream_query_response(response_text, metadata),
+                media_type="application/x-ndjson"
+            )
+        
+        return Response(
+            content=encode_query_response(response_text, metadata),
+            media_type="application/json"
+        )
         
     except Exception as e:
-        logger.error(f"Erro ao processar consulta: {str(e)}")
+        logger.exception("Erro ao processar consulta")
         raise HTTPException(status_code=500, detail=f"Erro ao processar consulta: {str(e)}")
 
-@app.get("/flow/{simulation_id}", response_model=FlowStatusResponse)
-async def get_flow_status(simulation_id: str):
+@app.get("/flow/{simulation_id}", responses={200: {"model": FlowStatusResponse}})
+async def get_flow_status(
+    simulation_id: str,
+    request: Request,
+    flow_store = Depends(get_flow_store)
+):
     """
     Retorna o status atual de uma simulação de fluxo de processamento.
+    
+    O estado só muda quando a simulação avança de etapa, então a etapa atual
+    identifica a versão: pollings sem mudança recebem 304 sem serializar o estado.
     """
-    if simulation_id not in flow_simulations:
+    state = await flow_store.get(simulation_id)
+    if state is None:
         raise HTTPException(status_code=404, detail=f"Simulação {simulation_id} não encontrada")
     
-    return flow_simulations[simulation_id]
+    etag = f'W/"{simulation_id}-{state["current_step"]}"'
+    return conditional_response(
+        request,
+        etag,
+        lambda: orjson.dumps(expand_flow_state(state), default=_orjson_default)
+    )
 
 @app.post("/flow/start")
 async def start_flow_simulation(
     request: QueryRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    flow_store = Depends(get_flow_store),
+    task_queue = Depends(get_task_queue)
 ):
     """
     Inicia uma nova simulação de fluxo de processamento.
     """
-    simulation_id = f"flow_{int(time.time())}"
+    simulation_id = f"flow_{secrets.token_hex(8)}"
     
-    background_tasks.add_task(
-        simulate_flow_processing,
-        simulation_id=simulation_id,
-        query=request.query,
-        objective=request.objective
+    await dispatch_flow_simulation(
+        task_queue,
+        background_tasks,
+        flow_store,
+        simulation_id,
+        request.query,
+        request.objective
     )
     
     return {
@@ -187,13 +396,9 @@ async def start_flow_simulation(
         "message": "Simulação iniciada com sucesso"
     }
 
-# Funções auxiliares
-def generate_mock_response(query: str, objective: str) -> str:
-    """
-    Gera uma resposta simulada com base na consulta e objetivo.
-    """
-    responses = {
-        "informative": f"""## Resumo
+# Respostas simuladas por objetivo (construídas uma única vez na importação)
+_RESPONSES: Dict[str, str] = {
+    "informative": """## Resumo
 Identificamos vários perfis de usuários com base em seus hábitos de uso da plataforma.
 
 ## Detalhes
@@ -217,7 +422,7 @@ Nossa análise de comportamento identificou os seguintes perfis principais:
 - Faltam informações sobre a jornada completa entre canais
 - Não há análise de correlação entre perfis e NPS""",
 
-        "hypothesis": f"""## Resumo da Hipótese
+    "hypothesis": """## Resumo da Hipótese
 A hipótese de personalização da home com base nos perfis de usuário tem forte potencial para aumentar o engajamento.
 
 ## Pontos Fortes
@@ -241,7 +446,7 @@ A hipótese está bem alinhada com as diretrizes de produto, especialmente nos p
 - Desenvolver métricas claras de sucesso
 - Considerar abordagem gradual com grupos de controle""",
 
-        "benchmark": f"""## Resumo Comparativo
+    "benchmark": """## Resumo Comparativo
 A análise de benchmark mostra que a personalização da home é uma tendência crescente no setor financeiro, com diferentes abordagens e níveis de sofisticação.
 
 ## Análise de Mercado
@@ -270,7 +475,7 @@ A maioria das instituições implementa personalização gradual, começando com
 - Considerar abordagem híbrida de personalização
 - Estabelecer métricas claras de sucesso para cada fase""",
 
-        "objectives": f"""## Resumo de Alinhamento
+    "objectives": """## Resumo de Alinhamento
 A personalização da home baseada em perfis de usuário está fortemente alinhada aos objetivos estratégicos do time para 2025.
 
 ## Análise por Objetivo
@@ -305,280 +510,87 @@ A personalização da home baseada em perfis de usuário está fortemente alinha
 - Estabelecer grupo de controle para medição precisa de impacto
 - Desenvolver plano de comunicação sobre os benefícios da personalização
 - Criar framework de decisão para resolução de conflitos entre objetivos"""
-    }
+}
+
+# Respostas simuladas já codificadas como strings JSON em UTF-8, indexadas pelo próprio texto
+_ENCODED_RESPONSES: Dict[str, bytes] = {text: orjson.dumps(text) for text in _RESPONSES.values()}
+
+
+# Funções auxiliares
+async def dispatch_flow_simulation(
+    task_queue,
+    background_tasks: BackgroundTasks,
+    flow_store,
+    simulation_id: str,
+    query: str,
+    objective: str
+) -> None:
+    """
+    Agenda uma simulação de fluxo.
     
-    # Fallback para objetivo informativo se não encontrar correspondência
-    return responses.get(objective, responses["informative"])
+    Com a fila de tarefas habilitada, a simulação é executada por um worker Arq
+    (ver app.workers); caso contrário, roda como tarefa em background da API.
+    """
+    if task_queue is not None:
+        await task_queue.enqueue_job("run_flow", simulation_id, query, objective)
+        return
+    
+    background_tasks.add_task(
+        simulate_flow_processing,
+        flow_store=flow_store,
+        simulation_id=simulation_id,
+        query=query,
+        objective=objective
+    )
 
-async def simulate_flow_processing(simulation_id: str, query: str, objective: str):
+async def embed_query(openai_client: Optional[AsyncOpenAI], query: str) -> Optional[List[float]]:
     """
-    Simula o processamento de fluxo do RAG em tempo real.
+    Gera o embedding da consulta para o cache semântico.
+    
+    Falhas não interrompem a consulta: sem embedding, o cache é ignorado.
     """
-    # Inicializar estado da simulação
-    flow_simulations[simulation_id] = {
-        "status": "running",
-        "current_step": 0,
-        "nodes": {
-            "query": "waiting",
-            "classification": "waiting",
-            "retrieval": "waiting",
-            "reranking": "waiting",
-            "context": "waiting",
-            "prompt": "waiting",
-            "generation": "waiting",
-            "response": "waiting"
-        },
-        "connections": {
-            "query_classification": "waiting",
-            "classification_retrieval": "waiting",
-            "retrieval_reranking": "waiting",
-            "reranking_context": "waiting",
-            "context_prompt": "waiting",
-            "prompt_generation": "waiting",
-            "generation_response": "waiting"
-        },
-        "metrics": {
-            "processingTime": 0,
-            "documentsRetrieved": 0,
-            "chunksProcessed": 0,
-            "tokensUsed": 0
-        },
-        "current_node_details": None
-    }
+    if openai_client is None:
+        return None
     
-    # Simular etapas do processamento
-    steps = [
-        # Etapa 1: Consulta
-        {
-            "delay": 1,
-            "updates": {
-                "current_step": 1,
-                "nodes": {"query": "active"},
-                "metrics": {"processingTime": 0.2},
-                "current_node_details": {
-                    "title": "Consulta do Usuário",
-                    "description": f"Analisando a consulta: \"{query}\"",
-                    "type": "input"
-                }
-            }
-        },
-        # Etapa 2: Conexão Consulta -> Classificação
-        {
-            "delay": 0.5,
-            "updates": {
-                "current_step": 2,
-                "nodes": {"query": "completed"},
-                "connections": {"query_classification": "active"},
-                "metrics": {"processingTime": 0.5}
-            }
-        },
-        # Etapa 3: Classificação
-        {
-            "delay": 1,
-            "updates": {
-                "current_step": 3,
-                "connections": {"query_classification": "completed"},
-                "nodes": {"classification": "active"},
-                "metrics": {"processingTime": 0.8},
-                "current_node_details": {
-                    "title": "Classificação de Objetivo",
-                    "description": f"Classificando a consulta como: \"{objective}\"",
-                    "type": "process"
-                }
-            }
-        },
-        # Etapa 4: Conexão Classificação -> Recuperação
-        {
-            "delay": 0.5,
-            "updates": {
-                "current_step": 4,
-                "nodes": {"classification": "completed"},
-                "connections": {"classification_retrieval": "active"},
-                "metrics": {"processingTime": 1.0}
-            }
-        },
-        # Etapa 5: Recuperação
-        {
-            "delay": 1.5,
-            "updates": {
-                "current_step": 5,
-                "connections": {"classification_retrieval": "completed"},
-                "nodes": {"retrieval": "active"},
-                "metrics": {
-                    "processingTime": 1.5,
-                    "documentsRetrieved": 3,
-                    "chunksProcessed": 12
-                },
-                "current_node_details": {
-                    "title": "Recuperação de Documentos",
-                    "description": "Buscando chunks relevantes na base vetorial usando similaridade semântica",
-                    "type": "storage"
-                }
-            }
-        },
-        # Etapa 6: Conexão Recuperação -> Reranking
-        {
-            "delay": 0.5,
-            "updates": {
-                "current_step": 6,
-                "nodes": {"retrieval": "completed"},
-                "connections": {"retrieval_reranking": "active"},
-                "metrics": {"processingTime": 1.8}
-            }
-        },
-        # Etapa 7: Reranking
-        {
-            "delay": 1,
-            "updates": {
-                "current_step": 7,
-                "connections": {"retrieval_reranking": "completed"},
-                "nodes": {"reranking": "active"},
-                "metrics": {"processingTime": 2.3},
-                "current_node_details": {
-                    "title": "Reranking de Resultados",
-                    "description": "Reordenando os 20 chunks iniciais para selecionar os 7 mais relevantes",
-                    "type": "process"
-                }
-            }
-        },
-        # Etapa 8: Conexão Reranking -> Contexto
-        {
-            "delay": 0.5,
-            "updates": {
-                "current_step": 8,
-                "nodes": {"reranking": "completed"},
-                "connections": {"reranking_context": "active"},
-                "metrics": {"processingTime": 2.5}
-            }
-        },
-        # Etapa 9: Contexto
-        {
-            "delay": 1,
-            "updates": {
-                "current_step": 9,
-                "connections": {"reranking_context": "completed"},
-                "nodes": {"context": "active"},
-                "metrics": {"processingTime": 3.0},
-                "current_node_details": {
-                    "title": "Seleção de Contexto",
-                    "description": "Comprimindo e priorizando informações para o contexto final",
-                    "type": "process"
-                }
-            }
-        },
-        # Etapa 10: Conexão Contexto -> Prompt
-        {
-            "delay": 0.5,
-            "updates": {
-                "current_step": 10,
-                "nodes": {"context": "completed"},
-                "connections": {"context_prompt": "active"},
-                "metrics": {"processingTime": 3.2}
-            }
-        },
-        # Etapa 11: Prompt
-        {
-            "delay": 1,
-            "updates": {
-                "current_step": 11,
-                "connections": {"context_prompt": "completed"},
-                "nodes": {"prompt": "active"},
-                "metrics": {"processingTime": 3.5},
-                "current_node_details": {
-                    "title": "Construção do Prompt",
-                    "description": f"Criando prompt especializado para consulta {objective} com contexto selecionado",
-                    "type": "process"
-                }
-            }
-        },
-        # Etapa 12: Conexão Prompt -> Geração
-        {
-            "delay": 0.5,
-            "updates": {
-                "current_step": 12,
-                "nodes": {"prompt": "completed"},
-                "connections": {"prompt_generation": "active"},
-                "metrics": {"processingTime": 3.7}
-            }
-        },
-        # Etapa 13: Geração
-        {
-            "delay": 2,
-            "updates": {
-                "current_step": 13,
-                "connections": {"prompt_generation": "completed"},
-                "nodes": {"generation": "active"},
-                "metrics": {
-                    "processingTime": 4.5,
-                    "tokensUsed": 1250
-                },
-                "current_node_details": {
-                    "title": "Geração de Resposta",
-                    "description": "Gerando resposta estruturada com base no prompt e contexto",
-                    "type": "api"
-                }
-            }
-        },
-        # Etapa 14: Conexão Geração -> Resposta
-        {
-            "delay": 0.5,
-            "updates": {
-                "current_step": 14,
-                "nodes": {"generation": "completed"},
-                "connections": {"generation_response": "active"},
-                "metrics": {"processingTime": 4.7}
-            }
-        },
-        # Etapa 15: Resposta
-        {
-            "delay": 1,
-            "updates": {
-                "current_step": 15,
-                "connections": {"generation_response": "completed"},
-                "nodes": {"response": "active"},
-                "metrics": {"processingTime": 5.0},
-                "current_node_details": {
-                    "title": "Formatação da Resposta",
-                    "description": "Processando e formatando a resposta final para o usuário",
-                    "type": "output"
-                }
-            }
-        },
-        # Etapa 16: Finalização
-        {
-            "delay": 1,
-            "updates": {
-                "current_step": 16,
-                "nodes": {"response": "completed"},
-                "status": "completed",
-                "current_node_details": {
-                    "title": "Processo Concluído",
-                    "description": "Todos os passos foram executados com sucesso",
-                    "type": "output"
-                }
-            }
-        }
-    ]
+    try:
+        response = await openai_client.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=query
+        )
+        return response.data[0].embedding
+    except Exception as e:
+        logger.warning("Cache semântico indisponível: %s", e)
+        return None
+
+def encode_query_response(response_text: str, metadata: Dict[str, Any]) -> bytes:
+    """
+    Monta o corpo JSON de /query reaproveitando respostas já codificadas.
+    """
+    response_json = _ENCODED_RESPONSES.get(response_text)
+    if response_json is None:
+        response_json = orjson.dumps(response_text)
     
-    # Executar simulação
-    for step in steps:
-        await asyncio.sleep(step["delay"])
-        
-        # Atualizar estado da simulação
-        for key, value in step["updates"].items():
-            if isinstance(value, dict):
-                # Atualizar dicionário existente
-                if key in flow_simulations[simulation_id]:
-                    flow_simulations[simulation_id][key].update(value)
-                else:
-                    flow_simulations[simulation_id][key] = value
-            else:
-                # Substituir valor
-                flow_simulations[simulation_id][key] = value
+    return (
+        b'{"response":' + response_json
+        + b',"metadata":' + orjson.dumps(metadata, default=_orjson_default) + b'}'
+    )
+
+async def stream_query_response(response_text: str, metadata: Dict[str, Any]):
+    """
+    Emite a resposta em linhas NDJSON à medida que os fragmentos ficam prontos.
     
-    # Manter simulação disponível por 10 minutos
-    await asyncio.sleep(600)
+    Quando conectado a um LLM real, os fragmentos devem vir diretamente do
+    stream de geração do modelo.
+    """
+    for start in range(0, len(response_text), STREAM_CHUNK_SIZE):
+        delta = response_text[start:start + STREAM_CHUNK_SIZE]
+        yield orjson.dumps({"delta": delta}) + b"\n"
     
-    # Remover simulação
-    if simulation_id in flow_simulations:
-        del flow_simulations[simulation_id]
+    yield orjson.dumps({"metadata": metadata, "done": True}, default=_orjson_default) + b"\n"
+
+def generate_mock_response(query: str, objective: str) -> str:
+    """
+    Gera uma resposta simulada com base na consulta e objetivo.
+    """
+    # Fallback para objetivo informativo se não encontrar correspondência
+    return _RESPONSES.get(objective, _RESPONSES["informative"])
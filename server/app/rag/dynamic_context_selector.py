@@ -6,9 +6,303 @@ o contexto mais relevante para cada consulta, maximizando a qualidade das respos
 """
 
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple, Mapping, Callable, TypeVar
+
+import httpx
+import numpy as np
+import tiktoken
+from cachetools import TTLCache
 from openai import AsyncOpenAI
 
+from app.rag.semantic_cache import SemanticCache
+
+try:
+    from numba import njit
+except ImportError:  # Numba é opcional: sem ele, o kernel de alocação roda em Python
+    njit = None
+
+
+# Fontes de diretrizes: (chave da fonte no contexto, tipo no repositório de diretrizes)
+_GUIDELINE_SOURCES = (
+    ("product_guidelines", "product"),
+    ("design_guidelines", "design"),
+    ("benchmarks", "benchmark"),
+    ("team_objectives", "objectives")
+)
+
+# Matriz de seleção de fontes por objetivo (somente leitura)
+_SELECTION_MATRIX = MappingProxyType({
+    "informative": MappingProxyType({
+        "chunks": True,
+        "product_guidelines": True,
+        "design_guidelines": False,
+        "benchmarks": False,
+        "team_objectives": False
+    }),
+    "hypothesis": MappingProxyType({
+        "chunks": True,
+        "product_guidelines": True,
+        "design_guidelines": True,
+        "benchmarks": True,
+        "team_objectives": False
+    }),
+    "benchmark": MappingProxyType({
+        "chunks": True,
+        "product_guidelines": True,
+        "design_guidelines": True,
+        "benchmarks": True,
+        "team_objectives": False
+    }),
+    "objectives": MappingProxyType({
+        "chunks": True,
+        "product_guidelines": True,
+        "design_guidelines": False,
+        "benchmarks": False,
+        "team_objectives": True
+    })
+})
+
+# Matriz de prioridades dos componentes por objetivo (somente leitura)
+_PRIORITY_MATRIX = MappingProxyType({
+    "informative": MappingProxyType({
+        "chunks": 0.85,
+        "product_guidelines": 0.15,
+        "design_guidelines": 0.0,
+        "benchmarks": 0.0,
+        "team_objectives": 0.0
+    }),
+    "hypothesis": MappingProxyType({
+        "chunks": 0.5,
+        "product_guidelines": 0.25,
+        "design_guidelines": 0.25,
+        "benchmarks": 0.0,
+        "team_objectives": 0.0
+    }),
+    "benchmark": MappingProxyType({
+        "chunks": 0.5,
+        "product_guidelines": 0.15,
+        "design_guidelines": 0.25,
+        "benchmarks": 0.1,
+        "team_objectives": 0.0
+    }),
+    "objectives": MappingProxyType({
+        "chunks": 0.5,
+        "product_guidelines": 0.25,
+        "design_guidelines": 0.0,
+        "benchmarks": 0.0,
+        "team_objectives": 0.25
+    })
+})
+
+# Componentes do contexto, na ordem usada nos vetores de alocação de tokens
+_CONTEXT_KEYS = ("chunks", "product_guidelines", "design_guidelines", "benchmarks", "team_objectives")
+
+
+def _priority_vector(priorities: Mapping[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converte as prioridades de um objetivo para o formato usado na alocação de tokens.
+    
+    Args:
+        priorities: Prioridades por componente
+        
+    Returns:
+        Tupla (vetor de prioridades na ordem de _CONTEXT_KEYS, índices em ordem
+        decrescente de prioridade)
+    """
+    weights = np.array([priorities[key] for key in _CONTEXT_KEYS], dtype=np.float64)
+    order = np.array(sorted(range(len(_CONTEXT_KEYS)), key=lambda i: -weights[i]), dtype=np.int64)
+    weights.flags.writeable = False
+    order.flags.writeable = False
+    
+    return weights, order
+
+
+# Prioridades de cada objetivo já vetorizadas e ordenadas (calculadas uma única vez)
+_PRIORITY_VECTORS = MappingProxyType({
+    objective: _priority_vector(priorities) for objective, priorities in _PRIORITY_MATRIX.items()
+})
+
+
+def _water_fill(weights: np.ndarray, caps: np.ndarray, order: np.ndarray, budget: int) -> np.ndarray:
+    """
+    Distribui um orçamento de tokens proporcionalmente às prioridades, limitado por fonte.
+    
+    O que exceder o tamanho de uma fonte volta a ser distribuído entre as demais
+    até esgotar o orçamento ou todas atingirem seu tamanho. Escrito como laço
+    sobre vetores de tamanho fixo para ser compilado pelo Numba quando disponível.
+    
+    Args:
+        weights: Prioridades por fonte
+        caps: Tokens disponíveis (tamanho) por fonte
+        order: Índices das fontes em ordem decrescente de prioridade
+        budget: Orçamento total de tokens
+        
+    Returns:
+        Tokens alocados por fonte
+    """
+    n = weights.shape[0]
+    allocation = np.zeros(n, dtype=np.int64)
+    active = np.zeros(n, dtype=np.bool_)
+    for i in range(n):
+        active[i] = weights[i] > 0 and caps[i] > 0
+        
+    remaining = budget
+    while remaining > 0:
+        total_weight = 0.0
+        for i in range(n):
+            if active[i]:
+                total_weight += weights[i]
+                
+        if total_weight == 0.0:
+            break
+            
+        # Parcela proporcional de cada fonte ativa, limitada ao seu tamanho
+        given = 0
+        for i in range(n):
+            if active[i]:
+                share = min(int(weights[i] / total_weight * remaining), caps[i] - allocation[i])
+                allocation[i] += share
+                given += share
+                
+        # Resto menor que a divisão: entregar à fonte ativa de maior prioridade
+        if given == 0:
+            for i in order:
+                if active[i]:
+                    given = min(remaining, caps[i] - allocation[i])
+                    allocation[i] += given
+                    break
+                    
+        remaining -= given
+        for i in range(n):
+            if allocation[i] >= caps[i]:
+                active[i] = False
+                
+    return allocation
+
+
+if njit is not None:
+    _water_fill = njit(cache=True)(_water_fill)
+
+# Nome descritivo de cada componente do contexto, usado nos prompts de compressão
+_COMPONENT_NAMES = {
+    "chunks": "chunks recuperados",
+    "product_guidelines": "diretrizes de produto",
+    "design_guidelines": "diretrizes de design",
+    "benchmarks": "benchmarks",
+    "team_objectives": "objetivos do time"
+}
+
+# Separador entre as partes (chunks ou seções) de um mesmo componente
+_SEPARATOR = "\n\n"
+
+# Tokens reservados por componente para a estrutura da resposta JSON da compressão em lote
+_JSON_OVERHEAD_TOKENS = 20
+
+# Número máximo de chunks mantidos após a filtragem por similaridade
+_MAX_CHUNKS = 5
+
+# Palavras-chave que identificam a intenção sem consultar o LLM
+_INTENT_PATTERN = re.compile(
+    r"\b(?P<benchmark>benchmarks?|concorrentes?|versus|vs\.?)(?!\w)"
+    r"|\b(?P<hypothesis>hip[óo]teses?|hypothesis|what if|e se)(?!\w)"
+    r"|\b(?P<objectives>okrs?|metas?|objetivos?)(?!\w)",
+    re.IGNORECASE
+)
+
+# Pool de conexões HTTP/2 do cliente OpenAI criado pelo próprio seletor: as chamadas
+# concorrentes de uma consulta são multiplexadas sobre conexões já estabelecidas
+_HTTP_POOL_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+
+# Espaços em branco colapsados na normalização de textos para deduplicação
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Número de caracteres normalizados considerados para identificar duplicatas
+_DEDUP_PREFIX_CHARS = 256
+
+# Número de caracteres de cada item mostrados nos prompts de filtragem
+_PREVIEW_CHARS = 300
+
+# Tempo de vida (em segundos) das diretrizes em cache; elas mudam em dias, não em segundos
+_GUIDELINES_CACHE_TTL = 600
+
+# Número de embeddings de consultas mantidos em memória
+_QUERY_EMBEDDING_CACHE_SIZE = 256
+
+# Similaridade mínima para reutilizar a intenção de uma consulta anterior
+_INTENT_SIMILARITY_THRESHOLD = 0.95
+
+# Número de intenções classificadas mantidas em memória
+_INTENT_CACHE_SIZE = 5000
+
+# Número de compressões mantidas em memória e seu tempo de vida (em segundos)
+_COMPRESSION_CACHE_SIZE = 1024
+_COMPRESSION_CACHE_TTL = 3600
+
+
+@lru_cache(maxsize=None)
+def _get_encoding() -> tiktoken.Encoding:
+    """
+    Carrega (uma única vez por processo) a codificação usada pelo GPT-4o.
+    """
+    return tiktoken.encoding_for_model("gpt-4o")
+
+
+@lru_cache(maxsize=4096)
+def _count_text_tokens(text: str) -> int:
+    """
+    Conta os tokens de um texto, memorizando o resultado.
+    
+    O mesmo texto costuma ser contado mais de uma vez (na alocação e novamente
+    antes da compressão), e as diretrizes se repetem entre consultas.
+    """
+    return len(_get_encoding().encode_ordinary(text))
+
+
+@lru_cache(maxsize=4096)
+def _preview(text: str) -> str:
+    """
+    Gera (e memoriza) a prévia de um texto para os prompts de filtragem.
+    
+    As mesmas seções de diretrizes aparecem em muitas consultas; textos curtos
+    são usados como estão, sem cópia e sem reticências.
+    """
+    if len(text) <= _PREVIEW_CHARS:
+        return text
+        
+    return text[:_PREVIEW_CHARS] + "..."
+
+
+T = TypeVar("T")
+
+
+def _dedup(items: List[T], text_of: Callable[[T], str]) -> List[T]:
+    """
+    Remove itens duplicados, mantendo a primeira ocorrência de cada texto.
+    
+    Textos que diferem apenas em caixa e espaçamento, nos primeiros caracteres,
+    são considerados o mesmo conteúdo (ex.: trechos citados em várias fontes).
+    
+    Args:
+        items: Itens a deduplicar
+        text_of: Função que extrai o texto de um item
+        
+    Returns:
+        Lista sem duplicatas, na ordem original
+    """
+    unique = {}
+    for item in items:
+        normalized = _WHITESPACE_PATTERN.sub(" ", text_of(item).lower()).strip()[:_DEDUP_PREFIX_CHARS]
+        key = hashlib.blake2b(normalized.encode(), digest_size=8).digest()
+        unique.setdefault(key, item)
+        
+    return list(unique.values())
+
 
 class DynamicContextSelector:
     """
@@ -26,7 +320,11 @@ class DynamicContextSelector:
         self,
         openai_client: Optional[AsyncOpenAI] = None,
         guidelines_repository = None,
-        max_total_tokens: int = 6000
+        max_total_tokens: int = 6000,
+        embedding_model: str = "text-embedding-3-small",
+        classifier_model: str = "gpt-4o-mini",
+        compressor_model: str = "gpt-4o",
+        intent_cache: Optional[SemanticCache] = None
     ):
         """
         Inicializa o seletor dinâmico de contexto.
@@ -35,12 +333,48 @@ class DynamicContextSelector:
             openai_client: Cliente OpenAI para classificação e compressão
             guidelines_repository: Repositório de diretrizes
             max_total_tokens: Limite máximo de tokens para o contexto
+            embedding_model: Modelo de embedding para a filtragem de chunks
+            classifier_model: Modelo para classificação de intenção e filtragem de seções
+            compressor_model: Modelo para compressão do contexto
+            intent_cache: Cache semântico de intenções classificadas (opcional)
         """
-        self.openai_client = openai_client or AsyncOpenAI()
+        # Sem cliente injetado, criar um com pool HTTP/2 próprio (fechado em aclose)
+        self._http_client = None
+        if openai_client is None:
+            self._http_client = httpx.AsyncClient(http2=True, limits=_HTTP_POOL_LIMITS)
+            openai_client = AsyncOpenAI(http_client=self._http_client)
+            
+        self.openai_client = openai_client
         self.guidelines_repo = guidelines_repository
         self.max_total_tokens = max_total_tokens
-        self.tokenizer = None  # Será inicializado sob demanda
+        self.embedding_model = embedding_model
+        self.classifier_model = classifier_model
+        self.compressor_model = compressor_model
+        self._query_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Comparar com None: um SemanticCache vazio é falso (define __len__), e um
+        # cache injetado ainda vazio também deve ser compartilhado
+        self.intent_cache = intent_cache if intent_cache is not None else SemanticCache(
+            similarity_threshold=_INTENT_SIMILARITY_THRESHOLD,
+            max_size=_INTENT_CACHE_SIZE
+        )
+        self._compressions: TTLCache = TTLCache(
+            maxsize=_COMPRESSION_CACHE_SIZE,
+            ttl=_COMPRESSION_CACHE_TTL
+        )
+        self._guidelines: TTLCache = TTLCache(maxsize=16, ttl=_GUIDELINES_CACHE_TTL)
+        self._guideline_fetches: Dict[str, "asyncio.Future[List[str]]"] = {}
+        
+    async def aclose(self) -> None:
+        """
+        Fecha o pool de conexões criado pelo seletor.
         
+        Clientes OpenAI injetados no construtor pertencem a quem os criou e não
+        são fechados aqui.
+        """
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+    
     async def select_context(
         self, 
         query: str, 
@@ -58,6 +392,9 @@ class DynamicContextSelector:
         Returns:
             Contexto otimizado para a consulta
         """
+        # Remover chunks duplicados antes de filtrar e comprimir
+        retrieved_chunks = _dedup(retrieved_chunks, lambda chunk: chunk["text"])
+        
         # 1. Classificar a intenção da consulta se não houver objetivo explícito
         if not objective:
             objective = await self._classify_intent(query)
@@ -65,34 +402,20 @@ class DynamicContextSelector:
         # 2. Selecionar fontes relevantes com base no objetivo
         relevant_sources = self._select_relevant_sources(objective)
         
-        # 3. Recuperar diretrizes relevantes para a consulta
-        product_guidelines = await self._get_relevant_guidelines(
-            query, "product", relevant_sources.get("product_guidelines", False)
-        )
-        
-        design_guidelines = await self._get_relevant_guidelines(
-            query, "design", relevant_sources.get("design_guidelines", False)
-        )
-        
-        benchmarks = await self._get_relevant_guidelines(
-            query, "benchmark", relevant_sources.get("benchmarks", False)
-        )
-        
-        team_objectives = await self._get_relevant_guidelines(
-            query, "objectives", relevant_sources.get("team_objectives", False)
+        # 3. Filtrar chunks por similaridade e recuperar diretrizes relevantes concorrentemente
+        filtered_chunks, guidelines = await asyncio.gather(
+            self._filter_relevant_chunks(query, retrieved_chunks),
+            self._select_guidelines(query, relevant_sources)
         )
         
-        # 4. Filtrar chunks por relevância
-        filtered_chunks = await self._filter_relevant_chunks(query, retrieved_chunks)
-        
-        # 5. Comprimir contexto para maximizar informação relevante
+        # 4. Comprimir contexto para maximizar informação relevante
         compressed_context = await self._compress_context(
             query,
             filtered_chunks,
-            product_guidelines,
-            design_guidelines,
-            benchmarks,
-            team_objectives,
+            guidelines["product_guidelines"],
+            guidelines["design_guidelines"],
+            guidelines["benchmarks"],
+            guidelines["team_objectives"],
             objective
         )
         
@@ -110,12 +433,27 @@ class DynamicContextSelector:
         """
         Classifica a intenção da consulta usando LLM.
         
+        Consultas com palavras-chave de uma única intenção, ou semanticamente
+        equivalentes a uma já classificada, são resolvidas sem chamada ao LLM.
+        
         Args:
             query: Consulta do usuário
             
         Returns:
             Objetivo classificado
         """
+        # Classificar diretamente quando as palavras-chave indicam uma só intenção
+        keyword_intents = {match.lastgroup for match in _INTENT_PATTERN.finditer(query)}
+        if len(keyword_intents) == 1:
+            return keyword_intents.pop()
+            
+        # Verificar se uma consulta semelhante já foi classificada
+        query_vector = await self._embed_query(query)
+        
+        cached_intent = self.intent_cache.get(query_vector)
+        if cached_intent is not None:
+            return cached_intent
+            
         # Preparar prompt para o LLM
         prompt = f"""
         Classifique a intenção da seguinte consulta em uma das categorias:
@@ -131,7 +469,7 @@ class DynamicContextSelector:
         
         # Obter resposta do LLM
         response = await self.openai_client.chat.completions.create(
-            model="gpt-4o",
+            model=self.classifier_model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0
         )
@@ -144,9 +482,11 @@ class DynamicContextSelector:
         if intent not in valid_intents:
             intent = "informative"  # Fallback para informativo
             
+        self.intent_cache.put(query_vector, intent)
+            
         return intent
     
-    def _select_relevant_sources(self, objective: str) -> Dict[str, bool]:
+    def _select_relevant_sources(self, objective: str) -> Mapping[str, bool]:
         """
         Determina quais fontes são relevantes com base no objetivo.
         
@@ -156,39 +496,46 @@ class DynamicContextSelector:
         Returns:
             Dicionário indicando quais fontes devem ser incluídas
         """
-        # Matriz de seleção de fontes por objetivo
-        selection_matrix = {
-            "informative": {
-                "chunks": True,
-                "product_guidelines": True,
-                "design_guidelines": False,
-                "benchmarks": False,
-                "team_objectives": False
-            },
-            "hypothesis": {
-                "chunks": True,
-                "product_guidelines": True,
-                "design_guidelines": True,
-                "benchmarks": True,
-                "team_objectives": False
-            },
-            "benchmark": {
-                "chunks": True,
-                "product_guidelines": True,
-                "design_guidelines": True,
-                "benchmarks": True,
-                "team_objectives": False
-            },
-            "objectives": {
-                "chunks": True,
-                "product_guidelines": True,
-                "design_guidelines": False,
-                "benchmarks": False,
-                "team_objectives": True
-            }
-        }
+        return _SELECTION_MATRIX.get(objective, _SELECTION_MATRIX["informative"])
+    
+    async def _select_guidelines(
+        self,
+        query: str,
+        relevant_sources: Mapping[str, bool]
+    ) -> Dict[str, List[str]]:
+        """
+        Recupera as diretrizes das fontes incluídas e filtra as seções relevantes.
         
-        return selection_matrix.get(objective, selection_matrix["informative"])
+        Args:
+            query: Consulta do usuário
+            relevant_sources: Fontes a incluir (ver _select_relevant_sources)
+            
+        Returns:
+            Dicionário de fonte para lista de seções relevantes
+        """
+        # Recuperar diretrizes das fontes incluídas concorrentemente
+        # (as fontes não incluídas não geram chamadas e ficam vazias)
+        included_sources = [
+            (source, guideline_type)
+            for source, guideline_type in _GUIDELINE_SOURCES
+            if self.guidelines_repo and relevant_sources.get(source, False)
+        ]
+        
+        included_guidelines = await asyncio.gather(*(
+            self._get_relevant_guidelines(query, guideline_type)
+            for _, guideline_type in included_sources
+        ))
+        
+        guidelines = {source: [] for source, _ in _GUIDELINE_SOURCES}
+        guidelines.update(zip((source for source, _ in included_sources), included_guidelines))
+        
+        # Filtrar seções de todas as fontes em uma única chamada ao LLM
+        relevance = await self._batch_filter_relevance(query, guidelines)
+        
+        for source, indices in relevance.items():
+            guidelines[source] = [guidelines[source][i] for i in indices]
+            
+        return guidelines
     
     async def _get_relevant_guidelines(
         self, 
@@ -197,7 +544,12 @@ class DynamicContextSelector:
         include: bool = True
     ) -> List[str]:
         """
-        Recupera diretrizes relevantes do repositório.
+        Recupera diretrizes do repositório.
+        
+        As diretrizes de cada tipo ficam em cache por alguns minutos, e consultas
+        concorrentes pelo mesmo tipo compartilham uma única busca no repositório.
+        A filtragem por relevância é feita depois, em lote com as demais fontes
+        (ver _batch_filter_relevance).
         
         Args:
             query: Consulta do usuário
@@ -205,75 +557,151 @@ class DynamicContextSelector:
             include: Se deve incluir este tipo de diretriz
             
         Returns:
-            Lista de diretrizes relevantes
+            Lista de diretrizes
         """
         if not include or not self.guidelines_repo:
             return []
             
-        # Recuperar diretrizes do repositório
-        guidelines = await self.guidelines_repo.get_guidelines(guideline_type)
+        guidelines = self._guidelines.get(guideline_type)
+        if guidelines is not None:
+            return guidelines
+            
+        # Reaproveitar a busca já em andamento para o mesmo tipo, se houver
+        fetch = self._guideline_fetches.get(guideline_type)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self._fetch_guidelines(guideline_type))
+            self._guideline_fetches[guideline_type] = fetch
+            fetch.add_done_callback(lambda _: self._guideline_fetches.pop(guideline_type, None))
+            
+        # Proteger a busca compartilhada do cancelamento de uma única consulta
+        return await asyncio.shield(fetch)
+    
+    async def _fetch_guidelines(self, guideline_type: str) -> List[str]:
+        """
+        Busca diretrizes no repositório e as armazena em cache.
         
-        # Filtrar apenas as seções relevantes para a consulta
-        relevant_sections = await self._filter_relevant_sections(query, guidelines)
+        Args:
+            guideline_type: Tipo de diretriz
+            
+        Returns:
+            Lista de diretrizes, sem seções duplicadas
+        """
+        guidelines = _dedup(await self.guidelines_repo.get_guidelines(guideline_type), str)
+        self._guidelines[guideline_type] = guidelines
         
-        return relevant_sections
+        return guidelines
     
-    async def _filter_relevant_sections(
-        self, 
-        query: str, 
-        sections: List[str]
-    ) -> List[str]:
+    async def _batch_filter_relevance(
+        self,
+        query: str,
+        groups: Dict[str, List[str]]
+    ) -> Dict[str, List[int]]:
         """
-        Filtra seções relevantes para a consulta.
+        Identifica os itens relevantes de vários grupos em uma única chamada ao LLM.
         
         Args:
             query: Consulta do usuário
-            sections: Lista de seções a filtrar
+            groups: Dicionário de nome do grupo para lista de textos
             
         Returns:
-            Lista de seções relevantes
+            Dicionário de nome do grupo para índices (base-0) dos itens relevantes
         """
-        if not sections:
-            return []
+        groups = {name: items for name, items in groups.items() if items}
+        if not groups:
+            return {}
             
-        # Preparar prompt para o LLM
-        sections_text = "\n\n".join([f"Seção {i+1}: {section[:300]}..." for i, section in enumerate(sections)])
+        # Preparar prompt para o LLM com todos os grupos
+        groups_text = "\n\n".join([
+            f"Grupo \"{name}\":\n" + "\n\n".join([f"Item {i+1}: {_preview(item)}" for i, item in enumerate(items)])
+            for name, items in groups.items()
+        ])
         
         prompt = f"""
-        Identifique as seções mais relevantes para a seguinte consulta:
+        Identifique, em cada grupo, os itens mais relevantes para a seguinte consulta:
         
         Consulta: {query}
         
-        Seções disponíveis:
-        {sections_text}
+        {groups_text}
         
-        Liste apenas os números das seções relevantes, separados por vírgula.
-        Se nenhuma seção for relevante, responda "0".
+        Responda em JSON: {{"relevant": {{"grupo": [1, 3, ...]}}}}, com a lista dos
+        números dos itens relevantes de cada grupo.
+        Se nenhum item de um grupo for relevante, use uma lista vazia.
         """
         
-        # Obter resposta do LLM
+        # Obter resposta do LLM restrita ao schema (listas de inteiros por grupo)
         response = await self.openai_client.chat.completions.create(
-            model="gpt-4o",
+            model=self.classifier_model,
             messages=[{"role": "user", "content": prompt}],
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "relevant_items",
+                    "strict": True,
+                    "schema": self._relevance_schema(list(groups))
+                }
+            },
             temperature=0
         )
         
-        # Extrair números das seções relevantes
-        sections_str = response.choices[0].message.content.strip()
-        relevant_indices = []
-        
+        # Extrair índices relevantes de cada grupo
         try:
-            if sections_str != "0":
-                for part in sections_str.split(","):
-                    idx = int(part.strip()) - 1  # Converter para índice base-0
-                    if 0 <= idx < len(sections):
-                        relevant_indices.append(idx)
-        except ValueError:
-            # Fallback para todas as seções se houver erro de parsing
-            relevant_indices = list(range(len(sections)))
-            
-        # Retornar apenas as seções relevantes
-        return [sections[i] for i in relevant_indices]
+            selected = json.loads(response.choices[0].message.content)["relevant"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            # Fallback para todos os itens se a resposta for recusada ou truncada
+            return {name: list(range(len(items))) for name, items in groups.items()}
+            
+        # Converter para índices base-0, descartando números fora do intervalo e repetidos
+        return {
+            name: sorted({number - 1 for number in selected[name] if 0 < number <= len(items)})
+            for name, items in groups.items()
+        }
+    
+    def _relevance_schema(self, group_names: List[str]) -> Dict[str, Any]:
+        """
+        Gera o JSON Schema da resposta da filtragem em lote.
+        
+        Args:
+            group_names: Nomes dos grupos filtrados
+            
+        Returns:
+            Schema exigindo uma lista de inteiros para cada grupo
+        """
+        return {
+            "type": "object",
+            "properties": {
+                "relevant": {
+                    "type": "object",
+                    "properties": {
+                        name: {"type": "array", "items": {"type": "integer"}}
+                        for name in group_names
+                    },
+                    "required": group_names,
+                    "additionalProperties": False
+                }
+            },
+            "required": ["relevant"],
+            "additionalProperties": False
+        }
+    
+    async def _filter_relevant_sections(
+        self, 
+        query: str, 
+        sections: List[str]
+    ) -> List[str]:
+        """
+        Filtra seções relevantes para a consulta.
+        
+        Args:
+            query: Consulta do usuário
+            sections: Lista de seções a filtrar
+            
+        Returns:
+            Lista de seções relevantes
+        """
+        sections = _dedup(sections, str)
+        relevance = await self._batch_filter_relevance(query, {"sections": sections})
+        
+        return [sections[i] for i in relevance.get("sections", [])]
     
     async def _filter_relevant_chunks(
         self, 
@@ -281,57 +709,91 @@ class DynamicContextSelector:
         chunks: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """
-        Filtra chunks por relevância para a consulta.
+        Filtra chunks por similaridade de cosseno com a consulta.
+        
+        Usa os embeddings já presentes nos chunks (chave "embedding") e gera, em
+        uma única chamada, apenas os que estiverem faltando.
         
         Args:
             query: Consulta do usuário
             chunks: Lista de chunks a filtrar
             
         Returns:
-            Lista de chunks relevantes
+            Lista dos chunks mais similares, do mais para o menos similar
         """
         # Se já temos poucos chunks, não filtrar
-        if len(chunks) <= 5:
+        if len(chunks) <= _MAX_CHUNKS:
             return chunks
             
-        # Preparar prompt para o LLM
-        chunks_text = "\n\n".join([f"Chunk {i+1}: {chunk['text'][:300]}..." for i, chunk in enumerate(chunks)])
+        missing = [i for i, chunk in enumerate(chunks) if chunk.get("embedding") is None]
         
-        prompt = f"""
-        Identifique os chunks mais relevantes para a seguinte consulta:
+        query_vector, missing_embeddings = await asyncio.gather(
+            self._embed_query(query),
+            self._embed_texts([chunks[i]["text"] for i in missing])
+        )
         
-        Consulta: {query}
+        embeddings = [chunk.get("embedding") for chunk in chunks]
+        for i, embedding in zip(missing, missing_embeddings):
+            embeddings[i] = embedding
+            
+        # Similaridade de cosseno entre a consulta e todos os chunks
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1.0
+        scores = (vectors @ query_vector) / norms
         
-        Chunks disponíveis:
-        {chunks_text}
+        # Selecionar os k mais similares
+        top = np.argpartition(-scores, _MAX_CHUNKS - 1)[:_MAX_CHUNKS]
+        top = top[np.argsort(-scores[top])]
         
-        Liste apenas os números dos chunks relevantes, separados por vírgula.
-        Se nenhum chunk for relevante, responda "0".
+        return [chunks[i] for i in top]
+    
+    async def _embed_query(self, query: str) -> np.ndarray:
         """
+        Gera o embedding normalizado de uma consulta, reutilizando os já calculados.
         
-        # Obter resposta do LLM
-        response = await self.openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0
-        )
+        Args:
+            query: Consulta do usuário
+            
+        Returns:
+            Vetor de norma unitária
+        """
+        vector = self._query_embeddings.get(query)
+        if vector is not None:
+            self._query_embeddings.move_to_end(query)
+            return vector
+            
+        embedding, = await self._embed_texts([query])
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+            
+        self._query_embeddings[query] = vector
+        if len(self._query_embeddings) > _QUERY_EMBEDDING_CACHE_SIZE:
+            self._query_embeddings.popitem(last=False)
+            
+        return vector
+    
+    async def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Gera embeddings para uma lista de textos em uma única chamada.
         
-        # Extrair números dos chunks relevantes
-        chunks_str = response.choices[0].message.content.strip()
-        relevant_indices = []
+        Args:
+            texts: Textos para gerar embeddings
+            
+        Returns:
+            Lista de embeddings, na mesma ordem dos textos
+        """
+        if not texts:
+            return []
+            
+        response = await self.openai_client.embeddings.create(
+            model=self.embedding_model,
+            input=texts
+        )
         
-        try:
-            if chunks_str != "0":
-                for part in chunks_str.split(","):
-                    idx = int(part.strip()) - 1  # Converter para índice base-0
-                    if 0 <= idx < len(chunks):
-                        relevant_indices.append(idx)
-        except ValueError:
-            # Fallback para todos os chunks se houver erro de parsing
-            relevant_indices = list(range(len(chunks)))
-            
-        # Retornar apenas os chunks relevantes
-        return [chunks[i] for i in relevant_indices]
+        return [item.embedding for item in response.data]
     
     async def _compress_context(
         self, 
@@ -358,103 +820,75 @@ class DynamicContextSelector:
         Returns:
             Contexto comprimido
         """
-        # Definir prioridades e limites de tokens para cada componente
-        priorities = self._get_priorities_by_objective(objective)
-        
-        # Concatenar textos por componente
-        chunks_text = "\n\n".join([chunk["text"] for chunk in chunks]) if chunks else ""
-        product_text = "\n\n".join(product_guidelines) if product_guidelines else ""
-        design_text = "\n\n".join(design_guidelines) if design_guidelines else ""
-        benchmarks_text = "\n\n".join(benchmarks) if benchmarks else ""
-        objectives_text = "\n\n".join(team_objectives) if team_objectives else ""
-        
-        # Calcular tokens iniciais
-        initial_tokens = {
-            "chunks": self._count_tokens(chunks_text),
-            "product_guidelines": self._count_tokens(product_text),
-            "design_guidelines": self._count_tokens(design_text),
-            "benchmarks": self._count_tokens(benchmarks_text),
-            "team_objectives": self._count_tokens(objectives_text)
+        # Ordenar chunks de forma canônica (documento, posição): o mesmo conjunto de
+        # documentos recuperados gera sempre o mesmo prefixo de prompt, permitindo
+        # que o cache de prompts do provedor reaproveite o prefill já calculado
+        chunks = sorted(chunks, key=self._chunk_order_key)
+        
+        # Partes de cada componente; os textos só são concatenados quando necessários
+        parts = {
+            "chunks": [chunk["text"] for chunk in chunks],
+            "product_guidelines": product_guidelines,
+            "design_guidelines": design_guidelines,
+            "benchmarks": benchmarks,
+            "team_objectives": team_objectives
         }
         
+        # Calcular tokens iniciais a partir das partes, sem concatená-las (as
+        # contagens de cada parte são memorizadas entre consultas)
+        initial_tokens = {source: self._count_parts_tokens(items) for source, items in parts.items()}
+        
         # Calcular total de tokens
         total_initial_tokens = sum(initial_tokens.values())
         
         # Se estiver dentro do limite, não comprimir
         if total_initial_tokens <= self.max_total_tokens:
-            return {
-                "chunks": chunks_text,
-                "product_guidelines": product_text,
-                "design_guidelines": design_text,
-                "benchmarks": benchmarks_text,
-                "team_objectives": objectives_text,
-                "total_tokens": total_initial_tokens
-            }
-        
-        # Alocar tokens com base nas prioridades
+            context = {source: _SEPARATOR.join(items) for source, items in parts.items()}
+            context["total_tokens"] = total_initial_tokens
+            
+            return context
+        
+        # Alocar tokens com base nas prioridades do objetivo
         token_allocation = self._allocate_tokens(
             self.max_total_tokens,
-            priorities,
+            objective,
             initial_tokens
         )
         
-        # Comprimir cada componente para o limite alocado
+        # Separar os componentes que realmente precisam de compressão
         compressed = {}
+        pending = {}
         
-        # Comprimir chunks
-        if chunks_text and token_allocation["chunks"] > 0:
-            compressed["chunks"] = await self._compress_component(
-                query, 
-                chunks_text, 
-                "chunks recuperados", 
-                token_allocation["chunks"]
-            )
-        else:
-            compressed["chunks"] = ""
-        
-        # Comprimir diretrizes de produto
-        if product_text and token_allocation["product_guidelines"] > 0:
-            compressed["product_guidelines"] = await self._compress_component(
-                query, 
-                product_text, 
-                "diretrizes de produto", 
-                token_allocation["product_guidelines"]
-            )
-        else:
-            compressed["product_guidelines"] = ""
-        
-        # Comprimir diretrizes de design
-        if design_text and token_allocation["design_guidelines"] > 0:
-            compressed["design_guidelines"] = await self._compress_component(
-                query, 
-                design_text, 
-                "diretrizes de design", 
-                token_allocation["design_guidelines"]
-            )
-        else:
-            compressed["design_guidelines"] = ""
-        
-        # Comprimir benchmarks
-        if benchmarks_text and token_allocation["benchmarks"] > 0:
-            compressed["benchmarks"] = await self._compress_component(
-                query, 
-                benchmarks_text, 
-                "benchmarks", 
-                token_allocation["benchmarks"]
-            )
-        else:
-            compressed["benchmarks"] = ""
-        
-        # Comprimir objetivos do time
-        if objectives_text and token_allocation["team_objectives"] > 0:
-            compressed["team_objectives"] = await self._compress_component(
-                query, 
-                objectives_text, 
-                "objetivos do time", 
-                token_allocation["team_objectives"]
+        for source, items in parts.items():
+            max_tokens = token_allocation[source]
+            
+            if not items or max_tokens <= 0:
+                compressed[source] = ""
+                continue
+                
+            text = _SEPARATOR.join(items)
+            if initial_tokens[source] <= max_tokens:
+                compressed[source] = text
+            else:
+                cache_key = self._compression_key(query, text, _COMPONENT_NAMES[source], max_tokens)
+                cached = self._compressions.get(cache_key)
+                if cached is not None:
+                    compressed[source] = cached
+                else:
+                    pending[source] = text
+        
+        # Comprimir os componentes pendentes: um único componente usa a compressão
+        # simples; vários são comprimidos juntos em uma única chamada ao LLM
+        if len(pending) == 1:
+            source, text = next(iter(pending.items()))
+            compressed[source] = await self._compress_component(
+                query,
+                text,
+                _COMPONENT_NAMES[source],
+                token_allocation[source]
             )
-        else:
-            compressed["team_objectives"] = ""
+        elif pending:
+            compressed.update(await self._compress_components(query, pending, token_allocation))
         
         # Calcular tokens finais
         total_tokens = sum([
@@ -469,7 +903,23 @@ class DynamicContextSelector:
         
         return compressed
     
-    def _get_priorities_by_objective(self, objective: str) -> Dict[str, float]:
+    def _chunk_order_key(self, chunk: Dict[str, Any]) -> Tuple[str, float]:
+        """
+        Define a ordem canônica de um chunk no contexto.
+        
+        Args:
+            chunk: Chunk recuperado
+            
+        Returns:
+            Tupla (título do documento, posição no documento)
+        """
+        metadata = chunk.get("metadata", {})
+        document = chunk.get("document_title", metadata.get("document_title", ""))
+        position = chunk.get("position", metadata.get("position", 0))
+        
+        return (document or "", position or 0)
+    
+    def _get_priorities_by_objective(self, objective: str) -> Mapping[str, float]:
         """
         Define prioridades para cada componente com base no objetivo.
         
@@ -479,109 +929,31 @@ class DynamicContextSelector:
         Returns:
             Dicionário de prioridades
         """
-        # Matriz de prioridades por objetivo
-        priority_matrix = {
-            "informative": {
-                "chunks": 0.85,
-                "product_guidelines": 0.15,
-                "design_guidelines": 0.0,
-                "benchmarks": 0.0,
-                "team_objectives": 0.0
-            },
-            "hypothesis": {
-                "chunks": 0.5,
-                "product_guidelines": 0.25,
-                "design_guidelines": 0.25,
-                "benchmarks": 0.0,
-                "team_objectives": 0.0
-            },
-            "benchmark": {
-                "chunks": 0.5,
-                "product_guidelines": 0.15,
-                "design_guidelines": 0.25,
-                "benchmarks": 0.1,
-                "team_objectives": 0.0
-            },
-            "objectives": {
-                "chunks": 0.5,
-                "product_guidelines": 0.25,
-                "design_guidelines": 0.0,
-                "benchmarks": 0.0,
-                "team_objectives": 0.25
-            }
-        }
-        
-        return priority_matrix.get(objective, priority_matrix["informative"])
+        return _PRIORITY_MATRIX.get(objective, _PRIORITY_MATRIX["informative"])
     
     def _allocate_tokens(
         self, 
         available_tokens: int, 
-        priorities: Dict[str, float],
+        objective: str,
         initial_tokens: Dict[str, int]
     ) -> Dict[str, int]:
         """
-        Aloca tokens disponíveis entre as fontes com base em suas prioridades.
+        Aloca tokens disponíveis entre as fontes com base nas prioridades do objetivo.
         
         Args:
             available_tokens: Número total de tokens disponíveis
-            priorities: Dicionário de prioridades por fonte
+            objective: Objetivo da consulta (ver _get_priorities_by_objective)
             initial_tokens: Tokens iniciais por fonte
             
         Returns:
             Dicionário com a alocação de tokens por fonte
         """
-        # Filtrar apenas fontes com conteúdo
-        active_priorities = {k: v for k, v in priorities.items() if initial_tokens[k] > 0}
-        
-        # Se não houver fontes ativas, retornar zeros
-        if not active_priorities:
-            return {k: 0 for k in priorities}
+        weights, order = _PRIORITY_VECTORS.get(objective, _PRIORITY_VECTORS["informative"])
+        caps = np.array([initial_tokens.get(key, 0) for key in _CONTEXT_KEYS], dtype=np.int64)
         
-        # Normalizar prioridades
-        total_priority = sum(active_priorities.values())
-        normalized_priorities = {k: v / total_priority for k, v in active_priorities.items()}
+        allocation = _water_fill(weights, caps, order, available_tokens)
         
-        # Alocar tokens proporcionalmente às prioridades
-        allocation = {}
-        for source in priorities:
-            if source in normalized_priorities:
-                allocation[source] = int(normalized_priorities[source] * available_tokens)
-            else:
-                allocation[source] = 0
-        
-        # Ajustar para garantir que o total seja exatamente igual aos tokens disponíveis
-        adjustment = available_tokens - sum(allocation.values())
-        if adjustment != 0 and active_priorities:
-            # Adicionar ou remover tokens da fonte com maior prioridade
-            max_priority_source = max(active_priorities, key=active_priorities.get)
-            allocation[max_priority_source] += adjustment
-        
-        # Garantir que nenhuma alocação exceda os tokens iniciais
-        for source, tokens in allocation.items():
-            if tokens > initial_tokens[source]:
-                # Redistribuir o excesso
-                excess = tokens - initial_tokens[source]
-                allocation[source] = initial_tokens[source]
-                
-                # Encontrar outras fontes que podem receber o excesso
-                candidates = {k: v for k, v in active_priorities.items() 
-                             if k != source and allocation[k] < initial_tokens[k]}
-                
-                if candidates:
-                    # Normalizar prioridades dos candidatos
-                    total_candidate_priority = sum(candidates.values())
-                    for candidate, priority in candidates.items():
-                        # Distribuir proporcionalmente
-                        share = int((priority / total_candidate_priority) * excess)
-                        allocation[candidate] += share
-                        excess -= share
-                    
-                    # Adicionar qualquer resto à fonte com maior prioridade
-                    if excess > 0 and candidates:
-                        max_candidate = max(candidates, key=candidates.get)
-                        allocation[max_candidate] += excess
-        
-        return allocation
+        return dict(zip(_CONTEXT_KEYS, allocation.tolist()))
     
     async def _compress_component(
         self, 
@@ -606,6 +978,12 @@ class DynamicContextSelector:
         if self._count_tokens(text) <= max_tokens:
             return text
             
+        # Reutilizar a compressão do mesmo conteúdo para a mesma consulta e limite
+        cache_key = self._compression_key(query, text, component_name, max_tokens)
+        compressed = self._compressions.get(cache_key)
+        if compressed is not None:
+            return compressed
+            
         # Preparar prompt para o LLM
         prompt = f"""
         Comprima as seguintes informações ({component_name}) para fornecer o contexto mais relevante 
@@ -620,16 +998,142 @@ class DynamicContextSelector:
         
         # Obter resposta do LLM
         response = await self.openai_client.chat.completions.create(
-            model="gpt-4o",
+            model=self.compressor_model,
             messages=[{"role": "user", "content": prompt}],
             max_tokens=max_tokens,
             temperature=0
         )
         
         compressed = response.choices[0].message.content.strip()
+        self._compressions[cache_key] = compressed
+        
+        return compressed
+    
+    async def _compress_components(
+        self,
+        query: str,
+        texts: Dict[str, str],
+        token_allocation: Dict[str, int]
+    ) -> Dict[str, str]:
+        """
+        Comprime vários componentes de contexto em uma única chamada ao LLM.
+        
+        Componentes ausentes ou inválidos na resposta são comprimidos
+        individualmente, em paralelo.
+        
+        Args:
+            query: Consulta do usuário
+            texts: Dicionário de componente para texto a comprimir
+            token_allocation: Limite de tokens por componente
+            
+        Returns:
+            Dicionário de componente para texto comprimido
+        """
+        components_text = "\n\n".join([
+            f"Componente \"{source}\" ({_COMPONENT_NAMES[source]}, no máximo {token_allocation[source]} tokens):\n{text}"
+            for source, text in texts.items()
+        ])
+        
+        prompt = f"""
+        Comprima cada um dos componentes abaixo para fornecer o contexto mais relevante 
+        para responder à consulta: "{query}"
+        
+        Mantenha apenas as informações essenciais, preservando detalhes importantes e removendo redundâncias.
+        Cada resposta deve ser concisa mas completa, contendo todas as informações relevantes para a consulta,
+        e respeitar o limite de tokens do seu componente.
+        
+        {components_text}
+        
+        Responda com um objeto JSON que associe o nome de cada componente ao seu texto comprimido.
+        """
+        
+        # Obter resposta do LLM
+        response = await self.openai_client.chat.completions.create(
+            model=self.compressor_model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=sum(token_allocation[source] + _JSON_OVERHEAD_TOKENS for source in texts),
+            response_format={"type": "json_object"},
+            temperature=0
+        )
         
+        try:
+            result = json.loads(response.choices[0].message.content)
+        except (TypeError, ValueError):
+            result = {}
+            
+        if not isinstance(result, dict):
+            result = {}
+            
+        compressed = {}
+        for source, text in texts.items():
+            value = result.get(source)
+            if isinstance(value, str) and value.strip():
+                compressed[source] = value.strip()
+                cache_key = self._compression_key(
+                    query, text, _COMPONENT_NAMES[source], token_allocation[source]
+                )
+                self._compressions[cache_key] = compressed[source]
+                
+        # Fallback: comprimir individualmente os componentes que faltaram
+        missing = [source for source in texts if source not in compressed]
+        if missing:
+            fallbacks = await asyncio.gather(*(
+                self._compress_component(
+                    query, texts[source], _COMPONENT_NAMES[source], token_allocation[source]
+                )
+                for source in missing
+            ))
+            compressed.update(zip(missing, fallbacks))
+            
         return compressed
     
+    def _compression_key(
+        self,
+        query: str,
+        text: str,
+        component_name: str,
+        max_tokens: int
+    ) -> bytes:
+        """
+        Gera a chave de cache de uma compressão a partir do seu conteúdo.
+        
+        Args:
+            query: Consulta do usuário
+            text: Texto a comprimir
+            component_name: Nome do componente
+            max_tokens: Limite de tokens
+            
+        Returns:
+            Digest de 16 bytes identificando a compressão
+        """
+        digest = hashlib.blake2b(
+            f"{query}\x00{component_name}\x00{max_tokens}\x00".encode(),
+            digest_size=16
+        )
+        digest.update(text.encode())
+        
+        return digest.digest()
+    
+    def _count_parts_tokens(self, parts: List[str]) -> int:
+        """
+        Conta os tokens do texto formado pelas partes unidas com o separador.
+        
+        Cada parte é contada (e memorizada) individualmente, sem construir o
+        texto concatenado; a diferença de tokenização nas fronteiras é desprezível.
+        
+        Args:
+            parts: Partes do componente
+            
+        Returns:
+            Número de tokens
+        """
+        if not parts:
+            return 0
+            
+        separator_tokens = _count_text_tokens(_SEPARATOR) * (len(parts) - 1)
+        
+        return sum(self._count_tokens(part) for part in parts) + separator_tokens
+    
     def _count_tokens(self, text: str) -> int:
         """
         Conta o número de tokens em um texto.
@@ -640,10 +1144,7 @@ class DynamicContextSelector:
         Returns:
             Número de tokens
         """
-        # Implementação simplificada
-        # Em produção, usar tiktoken para contagem precisa
         if not text:
             return 0
             
-        # Estimativa aproximada: 4 caracteres por token
-        return len(text) // 4
+        return _count_text_tokens(text)
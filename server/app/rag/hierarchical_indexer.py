@@ -6,12 +6,222 @@ para melhorar a qualidade da recuperação e permitir consultas mais contextuali
 """
 
 import uuid
+import json
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import logging
+import random
+import re
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Set, Callable, Awaitable, TypeVar
+import httpx
+import numpy as np
+import orjson
 import weaviate
 from weaviate.util import generate_uuid5
+import openai
 from openai import AsyncOpenAI
 
+logger = logging.getLogger(__name__)
+
+
+# Abaixo deste número de textos, a indexação de um corpus usa a API síncrona de embeddings
+BATCH_API_MIN_TEXTS = 1000
+
+# Número máximo de requisições por job da Batch API da OpenAI
+BATCH_API_MAX_REQUESTS = 50000
+
+# Intervalo (em segundos) entre consultas ao status de um job da Batch API
+BATCH_API_POLL_INTERVAL = 30
+
+# Status finais de um job da Batch API
+_BATCH_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+# Tempo (em segundos) que um embedding permanece no cache (30 dias)
+EMBEDDING_CACHE_TTL = 30 * 24 * 3600
+
+# Configurações de compressão do índice HNSW dos chunks. PQ é treinado
+# automaticamente ao atingir trainingLimit objetos; BQ dispensa treino e usa
+# rescoreLimit candidatos com vetores completos para recuperar o recall.
+VECTOR_COMPRESSION_CONFIGS = {
+    "pq": {"pq": {"enabled": True, "trainingLimit": 100000, "segments": 96}},
+    "bq": {"bq": {"enabled": True, "rescoreLimit": 200}},
+}
+
+# Propriedades copiadas do documento para o Weaviate: (propriedade, valor padrão)
+_DOC_FIELDS = (
+    ("title", ""),
+    ("source", ""),
+    ("type", ""),
+    ("category", ""),
+    ("author", ""),
+    ("created_at", ""),
+    ("tags", []),
+)
+
+# Propriedades do chunk lidas de seus metadados: (propriedade, chave nos metadados, valor padrão)
+_CHUNK_FIELDS = (
+    ("title", "section_title", ""),
+    ("document_id", "document_id", ""),
+    ("document_title", "document_title", ""),
+    ("document_source", "document_source", ""),
+    ("author", "author", ""),
+    ("position", "position", 0),
+    ("type", "type", ""),
+    ("category", "category", ""),
+    ("tags", "tags", []),
+)
+
+# Propriedades do documento desnormalizadas nos chunks, adicionadas às classes de
+# chunks criadas antes de existirem (ver setup_schema)
+_DENORMALIZED_CHUNK_PROPERTIES = (
+    {
+        "name": "document_source",
+        "dataType": ["text"],
+        "description": "Source of the parent document"
+    },
+    {
+        "name": "author",
+        "dataType": ["text"],
+        "description": "Author of the parent document"
+    },
+)
+
+# Campos dos chunks aceitos como filtro na recuperação
+_FILTERABLE_FIELDS = ("type", "category")
+
+# Pool HTTP do cliente OpenAI compartilhado (ingestão com muitas requisições simultâneas)
+_OPENAI_POOL_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=100)
+_OPENAI_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Novas tentativas de chamadas à OpenAI com espera exponencial (em segundos)
+OPENAI_MAX_ATTEMPTS = 6
+OPENAI_BACKOFF_BASE = 1.0
+OPENAI_BACKOFF_MAX = 60.0
+
+# Erros transitórios da OpenAI que justificam uma nova tentativa
+_RETRYABLE_OPENAI_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+T = TypeVar("T")
+
+# Cliente OpenAI compartilhado pelas instâncias criadas sem cliente injetado,
+# com o número de instâncias que o utilizam (fechado quando a última é fechada)
+_shared_openai_client: Optional[AsyncOpenAI] = None
+_shared_openai_client_users = 0
+
+# Pontuação de reranking: número no fim de cada linha da resposta do LLM, com
+# denominador opcional (aceita "8", "8.5", "Trecho 1: 8" e "Trecho 1: 8/10")
+_SCORE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(?:\s*/\s*\d+(?:\.\d+)?)?\s*$", re.MULTILINE)
+
+
+def _acquire_shared_openai_client() -> AsyncOpenAI:
+    """
+    Obtém o cliente OpenAI compartilhado, criando-o na primeira utilização.
+    
+    Returns:
+        Cliente OpenAI com pool de conexões ajustado
+    """
+    global _shared_openai_client, _shared_openai_client_users
+    
+    if _shared_openai_client is None:
+        # Novas tentativas ficam a cargo de _call_openai, que respeita o semáforo
+        _shared_openai_client = AsyncOpenAI(
+            http_client=httpx.AsyncClient(limits=_OPENAI_POOL_LIMITS, timeout=_OPENAI_TIMEOUT),
+            max_retries=0
+        )
+        
+    _shared_openai_client_users += 1
+    
+    return _shared_openai_client
+
+
+async def _release_shared_openai_client() -> None:
+    """
+    Libera o cliente OpenAI compartilhado, fechando-o quando não houver mais usuários.
+    """
+    global _shared_openai_client, _shared_openai_client_users
+    
+    _shared_openai_client_users -= 1
+    if _shared_openai_client_users == 0 and _shared_openai_client is not None:
+        await _shared_openai_client.close()
+        _shared_openai_client = None
+
+
+async def _call_openai(semaphore: asyncio.Semaphore, request: Callable[[], Awaitable[T]]) -> T:
+    """
+    Executa uma chamada à OpenAI limitando a concorrência e repetindo erros transitórios.
+    
+    A espera entre tentativas cresce exponencialmente (com jitter) e respeita o
+    cabeçalho Retry-After quando presente; o semáforo é liberado durante a
+    espera, para que as demais chamadas sigam no limite de taxa.
+    
+    Args:
+        semaphore: Semáforo que limita as chamadas simultâneas
+        request: Função sem argumentos que cria a chamada
+        
+    Returns:
+        Resposta da chamada
+    """
+    for attempt in range(OPENAI_MAX_ATTEMPTS):
+        try:
+            async with semaphore:
+                return await request()
+        except _RETRYABLE_OPENAI_ERRORS as e:
+            if attempt == OPENAI_MAX_ATTEMPTS - 1:
+                raise
+                
+            delay = min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1)
+            response = getattr(e, "response", None)
+            retry_after = response.headers.get("retry-after") if response is not None else None
+            if retry_after and retry_after.replace(".", "", 1).isdigit():
+                delay = max(delay, float(retry_after))
+                
+            logger.warning("Chamada à OpenAI falhou (%s); nova tentativa em %.1fs", type(e).__name__, delay)
+            await asyncio.sleep(delay)
+
+
+def _run_graphql(weaviate_client, query_builder) -> Dict[str, Any]:
+    """
+    Executa uma consulta GraphQL do Weaviate decodificando a resposta com orjson.
+    
+    O cliente v3 decodifica as respostas com o json da biblioteca padrão, que
+    domina o custo de respostas grandes (texto completo e vetores dos chunks).
+    
+    Args:
+        weaviate_client: Cliente Weaviate inicializado
+        query_builder: Consulta montada com client.query
+        
+    Returns:
+        Resposta da consulta
+        
+    Raises:
+        UnexpectedStatusCodeError: Se o Weaviate responder com status diferente de 2xx
+        RuntimeError: Se a resposta GraphQL trouxer erros
+    """
+    connection = getattr(weaviate_client, "_connection", None)
+    if connection is None:
+        response = query_builder.do()
+    else:
+        http_response = connection.post(path="/graphql", weaviate_object={"query": query_builder.build()})
+        if not 200 <= http_response.status_code < 300:
+            raise weaviate.exceptions.UnexpectedStatusCodeError("Query was not successful", http_response)
+            
+        response = orjson.loads(http_response.content)
+        
+    # Erros de consulta (ex.: propriedade inexistente) vêm com status 200 e sem
+    # "data": falhar em vez de devolver uma lista de resultados vazia
+    errors = response.get("errors") if isinstance(response, dict) else None
+    if errors:
+        raise RuntimeError(f"Consulta GraphQL ao Weaviate falhou: {errors}")
+        
+    return response
+
 
 class HierarchicalIndexer:
     """
@@ -30,7 +240,14 @@ class HierarchicalIndexer:
         openai_client: Optional[AsyncOpenAI] = None,
         embedding_model: str = "text-embedding-3-small",
         document_class: str = "Document",
-        chunk_class: str = "Chunk"
+        chunk_class: str = "Chunk",
+        batch_size: int = 100,
+        batch_dynamic: bool = True,
+        batch_workers: int = 4,
+        embedding_concurrency: int = 10,
+        embedding_cache=None,
+        vector_compression: Optional[str] = None,
+        background_writes: bool = True
     ):
         """
         Inicializa o indexador hierárquico.
@@ -41,23 +258,70 @@ class HierarchicalIndexer:
             embedding_model: Modelo de embedding a ser utilizado
             document_class: Nome da classe Weaviate para documentos
             chunk_class: Nome da classe Weaviate para chunks
+            batch_size: Número de chunks por requisição de importação em lote
+            batch_dynamic: Se o tamanho do lote deve se ajustar à latência do Weaviate
+            batch_workers: Número de requisições de importação em paralelo
+            embedding_concurrency: Número máximo de requisições de embedding simultâneas
+            embedding_cache: Cliente redis.asyncio para cache de embeddings por conteúdo (opcional)
+            vector_compression: Compressão dos vetores dos chunks ("pq", "bq" ou None)
+            background_writes: Se as gravações no Weaviate rodam em segundo plano
+                (os IDs são retornados antes da gravação; use drain() para aguardá-las)
         """
         self.vector_db = weaviate_client
-        self.openai_client = openai_client or AsyncOpenAI()
+        # Sem cliente injetado, usar o cliente compartilhado (liberado em aclose)
+        self._uses_shared_client = openai_client is None
+        self.openai_client = openai_client or _acquire_shared_openai_client()
         self.embedding_model = embedding_model
         self.document_class = document_class
         self.chunk_class = chunk_class
+        self.batch_size = batch_size
+        self.batch_dynamic = batch_dynamic
+        self.batch_workers = batch_workers
+        self._embedding_semaphore = asyncio.Semaphore(embedding_concurrency)
+        self.batch_jobs: Dict[str, Dict[str, Any]] = {}  # Jobs da Batch API por ID
+        self.embedding_cache = embedding_cache
+        if vector_compression is not None and vector_compression not in VECTOR_COMPRESSION_CONFIGS:
+            raise ValueError(f"Compressão de vetores desconhecida: {vector_compression}")
+        self.vector_compression = vector_compression
+        self._bulk_objects: Optional[List[Tuple[str, Dict[str, Any], str, List[float]]]] = None
+        self.background_writes = background_writes
+        self._write_tasks: Set[asyncio.Task] = set()
+        self._write_errors: List[BaseException] = []  # Falhas ainda não reportadas por drain()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
+    async def aclose(self) -> None:
+        """
+        Aguarda as gravações pendentes e libera o cliente OpenAI compartilhado, se utilizado.
+        
+        Clientes OpenAI injetados no construtor pertencem a quem os criou e não
+        são fechados aqui.
+        """
+        try:
+            await self.drain()
+        finally:
+            # Liberar o cliente mesmo que uma gravação pendente tenha falhado
+            if self._uses_shared_client:
+                self._uses_shared_client = False
+                await _release_shared_openai_client()
         
     async def setup_schema(self):
         """
         Configura o schema do Weaviate para documentos e chunks.
         """
-        # Verificar se as classes já existem
-        schema = self.vector_db.schema.get()
-        existing_classes = [c["class"] for c in schema["classes"]] if "classes" in schema else []
+        # Verificar se as classes já existem, sem baixar o schema inteiro
+        # (o cliente Weaviate é síncrono: as chamadas rodam fora do event loop)
+        document_class_exists, chunk_class_exists = await asyncio.gather(
+            asyncio.to_thread(self.vector_db.schema.exists, self.document_class),
+            asyncio.to_thread(self.vector_db.schema.exists, self.chunk_class)
+        )
         
         # Configurar classe de documentos se não existir
-        if self.document_class not in existing_classes:
+        if not document_class_exists:
             document_class_obj = {
                 "class": self.document_class,
                 "description": "Document class for hierarchical indexing",
@@ -105,10 +369,10 @@ class HierarchicalIndexer:
                     }
                 ]
             }
-            self.vector_db.schema.create_class(document_class_obj)
+            await asyncio.to_thread(self.vector_db.schema.create_class, document_class_obj)
         
         # Configurar classe de chunks se não existir
-        if self.chunk_class not in existing_classes:
+        if not chunk_class_exists:
             chunk_class_obj = {
                 "class": self.chunk_class,
                 "description": "Chunk class for hierarchical indexing",
@@ -134,6 +398,16 @@ class HierarchicalIndexer:
                         "dataType": ["text"],
                         "description": "Title of the parent document"
                     },
+                    {
+                        "name": "document_source",
+                        "dataType": ["text"],
+                        "description": "Source of the parent document"
+                    },
+                    {
+                        "name": "author",
+                        "dataType": ["text"],
+                        "description": "Author of the parent document"
+                    },
                     {
                         "name": "position",
                         "dataType": ["number"],
@@ -156,7 +430,24 @@ class HierarchicalIndexer:
                     }
                 ]
             }
-            self.vector_db.schema.create_class(chunk_class_obj)
+            
+            # Comprimir os vetores dos chunks, que dominam a memória do índice
+            if self.vector_compression:
+                chunk_class_obj["vectorIndexConfig"] = VECTOR_COMPRESSION_CONFIGS[self.vector_compression]
+                
+            await asyncio.to_thread(self.vector_db.schema.create_class, chunk_class_obj)
+        else:
+            # Classes de chunks criadas antes da desnormalização não têm as
+            # propriedades do documento, e o Weaviate rejeita consultas que as
+            # projetam: adicioná-las sem reindexar (os chunks antigos ficam vazios)
+            chunk_schema = await asyncio.to_thread(self.vector_db.schema.get, self.chunk_class)
+            existing = {prop["name"] for prop in chunk_schema.get("properties", [])}
+            
+            for prop in _DENORMALIZED_CHUNK_PROPERTIES:
+                if prop["name"] not in existing:
+                    await asyncio.to_thread(
+                        self.vector_db.schema.property.create, self.chunk_class, prop
+                    )
     
     async def index_document(
         self, 
@@ -176,18 +467,174 @@ class HierarchicalIndexer:
         # 1. Criar resumo do documento para embedding de documento
         doc_summary = self._create_document_summary(document)
         
-        # 2. Gerar embedding para o documento completo
-        doc_embedding = await self._generate_embedding(doc_summary)
+        # 2. Gerar embeddings do documento e de todos os chunks nas mesmas requisições
+        chunk_texts = [chunk["text"] for chunk in chunks]
+        doc_embedding, *chunk_embeddings = await self._generate_embeddings_batch(
+            [doc_summary] + chunk_texts
+        )
         
-        # 3. Indexar documento no nível superior
-        doc_id = await self._index_document_entry(document, doc_embedding)
+        return await self._index_with_embeddings(
+            document, chunks, doc_embedding, chunk_embeddings, doc_summary
+        )
+    
+    async def index_corpus_batch(
+        self,
+        docs_with_chunks: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+        poll_interval: float = BATCH_API_POLL_INTERVAL
+    ) -> List[Dict[str, Any]]:
+        """
+        Indexa um corpus inteiro gerando os embeddings pela Batch API da OpenAI.
         
-        # 4. Gerar embeddings para todos os chunks
-        chunk_texts = [chunk["text"] for chunk in chunks]
-        chunk_embeddings = await self._generate_embeddings_batch(chunk_texts)
+        A Batch API custa metade da API síncrona e tem limites de taxa maiores,
+        mas pode levar até 24h para concluir; é indicada para a carga inicial do
+        corpus. Corpora pequenos usam a API síncrona (ver index_document).
+        
+        Args:
+            docs_with_chunks: Lista de pares (documento, chunks do documento)
+            poll_interval: Intervalo entre consultas ao status do job em segundos
+            
+        Returns:
+            Lista com o resultado da indexação de cada documento
+        """
+        # 1. Montar uma requisição de embedding por texto (resumo do documento e chunks)
+        summaries = [self._create_document_summary(document) for document, _ in docs_with_chunks]
+        requests = []
+        for doc_index, (document, chunks) in enumerate(docs_with_chunks):
+            requests.append((f"{doc_index}:summary", summaries[doc_index]))
+            requests.extend(
+                (f"{doc_index}:{chunk_index}", chunk["text"])
+                for chunk_index, chunk in enumerate(chunks)
+            )
+            
+        # Corpus pequeno: a latência da Batch API não compensa
+        if len(requests) < BATCH_API_MIN_TEXTS:
+            return [
+                await self.index_document(document, chunks)
+                for document, chunks in docs_with_chunks
+            ]
+        
+        # 2. Gerar embeddings em jobs da Batch API executados em paralelo
+        job_embeddings = await asyncio.gather(*(
+            self._run_embedding_batch_job(requests[i:i+BATCH_API_MAX_REQUESTS], poll_interval)
+            for i in range(0, len(requests), BATCH_API_MAX_REQUESTS)
+        ))
+        
+        embeddings = {}
+        for job_result in job_embeddings:
+            embeddings.update(job_result)
+            
+        # 3. Indexar cada documento; documentos com embeddings faltando (requisições
+        # com erro no job) são indexados pela API síncrona
+        results = []
+        for doc_index, (document, chunks) in enumerate(docs_with_chunks):
+            doc_embedding = embeddings.get(f"{doc_index}:summary")
+            chunk_embeddings = [embeddings.get(f"{doc_index}:{i}") for i in range(len(chunks))]
+            
+            if doc_embedding is None or any(e is None for e in chunk_embeddings):
+                results.append(await self.index_document(document, chunks))
+            else:
+                results.append(await self._index_with_embeddings(
+                    document, chunks, doc_embedding, chunk_embeddings, summaries[doc_index]
+                ))
+                
+        return results
+    
+    async def _run_embedding_batch_job(
+        self,
+        requests: List[Tuple[str, str]],
+        poll_interval: float
+    ) -> Dict[str, List[float]]:
+        """
+        Executa um job da Batch API de embeddings e aguarda sua conclusão.
+        
+        Args:
+            requests: Lista de pares (custom_id, texto)
+            poll_interval: Intervalo entre consultas ao status do job em segundos
+            
+        Returns:
+            Dicionário de custom_id para embedding (apenas requisições bem-sucedidas)
+        """
+        # Enviar arquivo JSONL com uma requisição por linha
+        lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/embeddings",
+                "body": {"model": self.embedding_model, "input": text}
+            })
+            for custom_id, text in requests
+        ]
+        input_file = await self.openai_client.files.create(
+            file=("embeddings.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        
+        # Criar o job
+        response = await self.openai_client.post(
+            "/batches",
+            body={
+                "input_file_id": input_file.id,
+                "endpoint": "/v1/embeddings",
+                "completion_window": "24h"
+            },
+            cast_to=httpx.Response
+        )
+        job = response.json()
+        self.batch_jobs[job["id"]] = {"status": job["status"], "requests": len(requests)}
+        
+        # Aguardar a conclusão do job
+        while job["status"] not in _BATCH_FINAL_STATUSES:
+            await asyncio.sleep(poll_interval)
+            response = await self.openai_client.get(f"/batches/{job['id']}", cast_to=httpx.Response)
+            job = response.json()
+            self.batch_jobs[job["id"]]["status"] = job["status"]
+            
+        if not job.get("output_file_id"):
+            return {}
+            
+        # Baixar resultados e mapeá-los de volta pelo custom_id
+        output = await self.openai_client.files.content(job["output_file_id"])
+        
+        embeddings = {}
+        for line in output.text.splitlines():
+            if not line:
+                continue
+                
+            result = json.loads(line)
+            response_data = result.get("response") or {}
+            if response_data.get("status_code") == 200:
+                embeddings[result["custom_id"]] = response_data["body"]["data"][0]["embedding"]
+                
+        return embeddings
+    
+    async def _index_with_embeddings(
+        self,
+        document: Dict[str, Any],
+        chunks: List[Dict[str, Any]],
+        doc_embedding: List[float],
+        chunk_embeddings: List[List[float]],
+        summary: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Indexa um documento e seus chunks com embeddings já gerados.
         
-        # 5. Indexar cada chunk e vinculá-lo ao documento pai
+        Args:
+            document: Dicionário contendo o documento
+            chunks: Lista de chunks do documento
+            doc_embedding: Embedding do documento
+            chunk_embeddings: Embeddings dos chunks, na mesma ordem
+            summary: Resumo do documento já calculado (opcional)
+            
+        Returns:
+            Dicionário com IDs do documento e chunks indexados
+        """
+        # 3. Vincular os chunks ao documento pai; o UUID do documento é gerado uma
+        # única vez aqui (é aleatório para documentos sem "id") e repassado à
+        # gravação, então pode ser retornado antes de ela terminar
+        doc_id = self._entry_uuid(document)
         chunk_ids = []
+        chunk_objects = []
+        
         for i, chunk in enumerate(chunks):
             chunk_with_embedding = chunk.copy()
             chunk_with_embedding["embedding"] = chunk_embeddings[i]
@@ -196,21 +643,41 @@ class HierarchicalIndexer:
             # Adicionar metadados do documento ao chunk
             if "metadata" not in chunk_with_embedding:
                 chunk_with_embedding["metadata"] = {}
-                
+            
             chunk_with_embedding["metadata"]["document_id"] = doc_id
             chunk_with_embedding["metadata"]["document_title"] = document.get("title", "")
+            chunk_with_embedding["metadata"]["document_source"] = document.get("source", "")
+            chunk_with_embedding["metadata"]["author"] = document.get("author", "")
             
             # Herdar tipo e categoria do documento
             if "type" not in chunk_with_embedding["metadata"] and "type" in document:
                 chunk_with_embedding["metadata"]["type"] = document["type"]
-                
+            
             if "category" not in chunk_with_embedding["metadata"] and "category" in document:
                 chunk_with_embedding["metadata"]["category"] = document["category"]
             
-            chunk_id = await self._index_chunk_entry(chunk_with_embedding)
+            chunk_id = self._entry_uuid(chunk_with_embedding)
+            chunk_objects.append((
+                self.chunk_class,
+                self._chunk_properties(chunk_with_embedding),
+                chunk_id,
+                chunk_with_embedding["embedding"]
+            ))
             chunk_ids.append(chunk_id)
+            
+        # 4. Indexar documento no nível superior e os chunks em lote. O destino
+        # (lote da carga em massa ou gravação direta) é decidido agora: uma
+        # gravação em segundo plano não pode cair em um bulk_load aberto depois
+        bulk_objects = self._bulk_objects
+        write = self._write_entries(doc_id, document, doc_embedding, summary, chunk_objects, bulk_objects)
+        if self.background_writes and bulk_objects is None:
+            task = asyncio.create_task(write)
+            self._write_tasks.add(task)
+            task.add_done_callback(self._on_write_done)
+        else:
+            await write
         
-        # 6. Atualizar documento com referências aos chunks
+        # 5. Atualizar documento com referências aos chunks
         await self._update_document_with_chunks(doc_id, chunk_ids)
         
         return {
@@ -219,6 +686,107 @@ class HierarchicalIndexer:
             "chunks_count": len(chunks)
         }
     
+    async def _write_entries(
+        self,
+        doc_id: str,
+        document: Dict[str, Any],
+        doc_embedding: List[float],
+        summary: Optional[str],
+        chunk_objects: List[Tuple[str, Dict[str, Any], str, List[float]]],
+        bulk_objects: Optional[List[Tuple[str, Dict[str, Any], str, List[float]]]] = None
+    ) -> None:
+        """
+        Grava um documento e seus chunks no Weaviate.
+        
+        Args:
+            doc_id: UUID do documento, já referenciado pelos chunks
+            document: Documento a ser indexado
+            doc_embedding: Embedding do documento
+            summary: Resumo do documento já calculado (opcional)
+            chunk_objects: Chunks preparados como (classe, propriedades, UUID, embedding)
+            bulk_objects: Lote da carga em massa em andamento (None para gravar já)
+        """
+        await self._index_document_entry(doc_id, document, doc_embedding, summary, bulk_objects)
+        
+        # Em carga em massa, a importação fica para o fim da carga; caso contrário,
+        # importar já (a importação em lote bloqueia enquanto envia as requisições)
+        if bulk_objects is not None:
+            bulk_objects.extend(chunk_objects)
+        else:
+            await asyncio.to_thread(self._import_objects, chunk_objects)
+    
+    def _on_write_done(self, task: asyncio.Task) -> None:
+        """
+        Remove uma gravação concluída do conjunto pendente, guardando falhas.
+        
+        Args:
+            task: Tarefa de gravação concluída
+        """
+        self._write_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Falha ao gravar documento no Weaviate", exc_info=task.exception())
+            # Guardada para drain(), mesmo que a tarefa termine antes de ser aguardada
+            self._write_errors.append(task.exception())
+    
+    async def drain(self) -> None:
+        """
+        Aguarda todas as gravações em segundo plano pendentes.
+        
+        Raises:
+            Exception: Primeira falha de gravação desde o último drain(), incluindo
+                gravações que falharam antes da chamada
+        """
+        while self._write_tasks:
+            await asyncio.gather(*self._write_tasks, return_exceptions=True)
+            
+        if self._write_errors:
+            error = self._write_errors[0]
+            self._write_errors.clear()
+            raise error
+    
+    @asynccontextmanager
+    async def bulk_load(self) -> AsyncIterator["HierarchicalIndexer"]:
+        """
+        Agrupa a indexação de vários documentos em uma única importação em lote.
+        
+        Dentro do bloco, index_document e index_corpus_batch apenas acumulam
+        documentos e chunks; tudo é importado de uma vez ao sair, com um lote
+        por requisição cheio em vez de um lote por documento. Para cargas muito
+        grandes, habilite também ASYNC_INDEXING no servidor Weaviate, que
+        constrói o índice HNSW em segundo plano.
+        
+        Uso:
+            async with indexer.bulk_load():
+                for document, chunks in corpus:
+                    await indexer.index_document(document, chunks)
+        """
+        # Concluir as gravações em segundo plano anteriores ao bloco
+        await self.drain()
+        
+        self._bulk_objects = []
+        try:
+            yield self
+            await asyncio.to_thread(self._import_objects, self._bulk_objects)
+        finally:
+            self._bulk_objects = None
+    
+    def _import_objects(self, objects: List[Tuple[str, Dict[str, Any], str, List[float]]]) -> None:
+        """
+        Importa objetos pela API de lote do Weaviate (chamada bloqueante).
+        
+        Args:
+            objects: Lista de tuplas (classe, propriedades, UUID, embedding)
+        """
+        batch = self.vector_db.batch(
+            batch_size=self.batch_size,
+            dynamic=self.batch_dynamic,
+            num_workers=self.batch_workers
+        )
+        
+        with batch:
+            for class_name, properties, object_id, embedding in objects:
+                batch.add_data_object(properties, class_name, object_id, vector=embedding)
+    
     async def _generate_embedding(self, text: str) -> List[float]:
         """
         Gera embedding para um texto usando a API OpenAI.
@@ -229,9 +797,9 @@ class HierarchicalIndexer:
         Returns:
             Lista de floats representando o embedding
         """
-        response = await self.openai_client.embeddings.create(
-            model=self.embedding_model,
-            input=text
+        response = await _call_openai(
+            self._embedding_semaphore,
+            partial(self.openai_client.embeddings.create, model=self.embedding_model, input=text)
         )
         return response.data[0].embedding
     
@@ -250,19 +818,100 @@ class HierarchicalIndexer:
         Returns:
             Lista de embeddings
         """
-        all_embeddings = []
+        # Reaproveitar embeddings de textos já indexados (ex.: chunks inalterados
+        # ao reindexar um documento); só os textos ausentes vão para a API
+        cache_keys = [self._embedding_cache_key(text) for text in texts]
+        embeddings = await self._get_cached_embeddings(cache_keys)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
         
-        # Processar em lotes para evitar limites de API
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i+batch_size]
-            response = await self.openai_client.embeddings.create(
-                model=self.embedding_model,
-                input=batch
-            )
-            batch_embeddings = [item.embedding for item in response.data]
-            all_embeddings.extend(batch_embeddings)
+        if not missing:
+            return embeddings
+            
+        missing_texts = [texts[i] for i in missing]
+        
+        # Processar em lotes para evitar limites de API, enviando os lotes em
+        # paralelo (limitados pelo semáforo para não estourar o rate limit)
+        responses = await asyncio.gather(*(
+            self._create_embeddings(missing_texts[i:i+batch_size])
+            for i in range(0, len(missing_texts), batch_size)
+        ))
+        
+        fresh = [item.embedding for response in responses for item in response.data]
+        for i, embedding in zip(missing, fresh):
+            embeddings[i] = embedding
+            
+        await self._cache_embeddings({cache_keys[i]: embeddings[i] for i in missing})
+        
+        return embeddings
+    
+    def _embedding_cache_key(self, text: str) -> str:
+        """
+        Gera a chave de cache de um embedding a partir do modelo e do conteúdo.
+        
+        Args:
+            text: Texto do embedding
+            
+        Returns:
+            Chave de cache
+        """
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        
+        return f"embedding:{self.embedding_model}:{digest}"
+    
+    async def _get_cached_embeddings(self, cache_keys: List[str]) -> List[Optional[List[float]]]:
+        """
+        Busca embeddings em cache em uma única requisição.
+        
+        Args:
+            cache_keys: Chaves de cache dos textos
+            
+        Returns:
+            Lista de embeddings na mesma ordem (None para textos sem cache)
+        """
+        if self.embedding_cache is None or not cache_keys:
+            return [None] * len(cache_keys)
+            
+        try:
+            cached = await self.embedding_cache.mget(cache_keys)
+        except Exception as e:
+            # Falha no cache não impede a indexação: gerar todos os embeddings
+            logger.warning("Cache de embeddings indisponível: %s", e)
+            return [None] * len(cache_keys)
+            
+        return [orjson.loads(value) if value is not None else None for value in cached]
+    
+    async def _cache_embeddings(self, embeddings: Dict[str, List[float]]) -> None:
+        """
+        Armazena embeddings recém-gerados no cache.
+        
+        Args:
+            embeddings: Dicionário de chave de cache para embedding
+        """
+        if self.embedding_cache is None or not embeddings:
+            return
             
-        return all_embeddings
+        try:
+            async with self.embedding_cache.pipeline(transaction=False) as pipe:
+                for key, embedding in embeddings.items():
+                    pipe.set(key, orjson.dumps(embedding), ex=EMBEDDING_CACHE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("Falha ao gravar cache de embeddings: %s", e)
+    
+    async def _create_embeddings(self, batch: List[str]):
+        """
+        Envia um lote de textos para a API de embeddings.
+        
+        Args:
+            batch: Textos do lote
+            
+        Returns:
+            Resposta da API OpenAI
+        """
+        return await _call_openai(
+            self._embedding_semaphore,
+            partial(self.openai_client.embeddings.create, model=self.embedding_model, input=batch)
+        )
     
     def _create_document_summary(self, document: Dict[str, Any]) -> str:
         """
@@ -300,42 +949,45 @@ class HierarchicalIndexer:
     
     async def _index_document_entry(
         self, 
+        doc_uuid: str,
         document: Dict[str, Any], 
-        embedding: List[float]
+        embedding: List[float],
+        summary: Optional[str] = None,
+        bulk_objects: Optional[List[Tuple[str, Dict[str, Any], str, List[float]]]] = None
     ) -> str:
         """
         Indexa um documento no Weaviate.
         
         Args:
+            doc_uuid: UUID do documento (ver _entry_uuid)
             document: Documento a ser indexado
             embedding: Embedding do documento
+            summary: Resumo do documento já calculado (gerado se ausente)
+            bulk_objects: Lote da carga em massa em andamento (None para gravar já)
             
         Returns:
             ID do documento indexado
         """
-        # Gerar UUID consistente se o documento tiver ID
-        if "id" in document:
-            doc_uuid = generate_uuid5(document["id"])
-        else:
-            doc_uuid = str(uuid.uuid4())
-        
-        # Preparar propriedades do documento
+        # Preparar propriedades não vazias do documento em uma única passada
         properties = {
-            "title": document.get("title", ""),
-            "summary": self._create_document_summary(document),
-            "source": document.get("source", ""),
-            "type": document.get("type", ""),
-            "category": document.get("category", ""),
-            "author": document.get("author", ""),
-            "created_at": document.get("created_at", ""),
-            "tags": document.get("tags", [])
+            name: value
+            for name, default in _DOC_FIELDS
+            for value in (document.get(name, default),)
+            if value
         }
         
-        # Remover propriedades vazias
-        properties = {k: v for k, v in properties.items() if v}
+        summary = summary if summary is not None else self._create_document_summary(document)
+        if summary:
+            properties["summary"] = summary
         
+        # Em carga em massa, o documento entra no lote junto com os chunks
+        if bulk_objects is not None:
+            bulk_objects.append((self.document_class, properties, doc_uuid, embedding))
+            return doc_uuid
+            
         # Indexar no Weaviate
-        self.vector_db.data_object.create(
+        await asyncio.to_thread(
+            self.vector_db.data_object.create,
             properties,
             self.document_class,
             doc_uuid,
@@ -354,33 +1006,12 @@ class HierarchicalIndexer:
         Returns:
             ID do chunk indexado
         """
-        # Gerar UUID consistente se o chunk tiver ID
-        if "id" in chunk:
-            chunk_uuid = generate_uuid5(chunk["id"])
-        else:
-            chunk_uuid = str(uuid.uuid4())
-        
-        # Extrair metadados
-        metadata = chunk.get("metadata", {})
-        
-        # Preparar propriedades do chunk
-        properties = {
-            "text": chunk["text"],
-            "title": metadata.get("section_title", ""),
-            "document_id": metadata.get("document_id", ""),
-            "document_title": metadata.get("document_title", ""),
-            "position": metadata.get("position", 0),
-            "type": metadata.get("type", ""),
-            "category": metadata.get("category", ""),
-            "tags": metadata.get("tags", [])
-        }
-        
-        # Remover propriedades vazias
-        properties = {k: v for k, v in properties.items() if v}
+        chunk_uuid = self._entry_uuid(chunk)
         
         # Indexar no Weaviate
-        self.vector_db.data_object.create(
-            properties,
+        await asyncio.to_thread(
+            self.vector_db.data_object.create,
+            self._chunk_properties(chunk),
             self.chunk_class,
             chunk_uuid,
             vector=chunk["embedding"]
@@ -388,6 +1019,47 @@ class HierarchicalIndexer:
         
         return chunk_uuid
     
+    def _entry_uuid(self, entry: Dict[str, Any]) -> str:
+        """
+        Gera o UUID de um documento ou chunk.
+        
+        Args:
+            entry: Documento ou chunk
+            
+        Returns:
+            UUID consistente se a entrada tiver ID, ou aleatório caso contrário
+        """
+        if "id" in entry:
+            return generate_uuid5(entry["id"])
+            
+        return str(uuid.uuid4())
+    
+    def _chunk_properties(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Prepara as propriedades de um chunk para o Weaviate.
+        
+        Args:
+            chunk: Chunk a ser indexado
+            
+        Returns:
+            Propriedades não vazias do chunk
+        """
+        # Extrair metadados
+        metadata = chunk.get("metadata", {})
+        
+        # Preparar propriedades não vazias do chunk em uma única passada
+        properties = {
+            name: value
+            for name, key, default in _CHUNK_FIELDS
+            for value in (metadata.get(key, default),)
+            if value
+        }
+        
+        if chunk["text"]:
+            properties["text"] = chunk["text"]
+            
+        return properties
+    
     async def _update_document_with_chunks(
         self, 
         doc_id: str, 
@@ -415,31 +1087,26 @@ class HierarchicalIndexer:
         Returns:
             Resultado da operação
         """
-        # 1. Buscar todos os chunks associados ao documento
-        result = self.vector_db.query.get(
-            self.chunk_class, 
-            ["id"]
-        ).with_where({
-            "path": ["document_id"],
-            "operator": "Equal",
-            "valueString": document_id
-        }).do()
-        
-        # 2. Remover cada chunk
-        chunks_deleted = 0
-        if "data" in result and "Get" in result["data"] and self.chunk_class in result["data"]["Get"]:
-            chunks = result["data"]["Get"][self.chunk_class]
-            for chunk in chunks:
-                self.vector_db.data_object.delete(
-                    self.chunk_class,
-                    chunk["id"]
-                )
-                chunks_deleted += 1
-        
-        # 3. Remover o documento
-        self.vector_db.data_object.delete(
-            self.document_class,
-            document_id
+        # Concluir gravações pendentes, que recriariam objetos já removidos
+        await self.drain()
+        
+        # 1. Remover todos os chunks associados ao documento em uma única requisição
+        result = await asyncio.to_thread(
+            self.vector_db.batch.delete_objects,
+            self.chunk_class,
+            {
+                "path": ["document_id"],
+                "operator": "Equal",
+                "valueText": document_id
+            }
+        )
+        chunks_deleted = result.get("results", {}).get("successful", 0)
+        
+        # 2. Remover o documento
+        await asyncio.to_thread(
+            self.vector_db.data_object.delete,
+            document_id,
+            self.document_class
         )
         
         return {
@@ -466,7 +1133,12 @@ class EnhancedRetriever:
         openai_client: Optional[AsyncOpenAI] = None,
         embedding_model: str = "text-embedding-3-small",
         document_class: str = "Document",
-        chunk_class: str = "Chunk"
+        chunk_class: str = "Chunk",
+        reranker_model: Optional[str] = "BAAI/bge-reranker-base",
+        reranker_device: Optional[str] = None,
+        hybrid_alpha: float = 0.5,
+        native_rerank: bool = False,
+        openai_concurrency: int = 10
     ):
         """
         Inicializa o recuperador avançado.
@@ -477,12 +1149,44 @@ class EnhancedRetriever:
             embedding_model: Modelo de embedding a ser utilizado
             document_class: Nome da classe Weaviate para documentos
             chunk_class: Nome da classe Weaviate para chunks
+            reranker_model: Modelo cross-encoder para reranking (None para usar o LLM)
+            reranker_device: Dispositivo do cross-encoder (ex.: "cuda"); None escolhe automaticamente
+            hybrid_alpha: Peso da busca vetorial na busca híbrida (0 = apenas BM25, 1 = apenas vetorial)
+            native_rerank: Se o reranking deve ser feito pelo módulo de rerank do Weaviate
+                (reranker-cohere ou reranker-transformers habilitado no cluster)
+            openai_concurrency: Número máximo de requisições simultâneas à OpenAI
         """
         self.vector_db = weaviate_client
-        self.openai_client = openai_client or AsyncOpenAI()
+        # Sem cliente injetado, usar o cliente compartilhado (liberado em aclose)
+        self._uses_shared_client = openai_client is None
+        self.openai_client = openai_client or _acquire_shared_openai_client()
         self.embedding_model = embedding_model
         self.document_class = document_class
         self.chunk_class = chunk_class
+        self.reranker_model = reranker_model
+        self.reranker_device = reranker_device
+        self.hybrid_alpha = hybrid_alpha
+        self.native_rerank = native_rerank
+        self._openai_semaphore = asyncio.Semaphore(openai_concurrency)
+        self._reranker = None  # Carregado no primeiro reranking
+        self._reranker_lock = asyncio.Lock()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
+    async def aclose(self) -> None:
+        """
+        Libera o cliente OpenAI compartilhado, se utilizado.
+        
+        Clientes OpenAI injetados no construtor pertencem a quem os criou e não
+        são fechados aqui.
+        """
+        if self._uses_shared_client:
+            self._uses_shared_client = False
+            await _release_shared_openai_client()
     
     async def retrieve(
         self, 
@@ -509,13 +1213,8 @@ class EnhancedRetriever:
         # 2. Fase 1: Recuperação inicial
         initial_results = await self._initial_retrieval(query, query_embedding, filters, top_k)
         
-        # 3. Fase 2: Reranking
-        reranked_results = await self._rerank_results(query, initial_results)
-        
-        # 4. Selecionar os top_k resultados após reranking
-        final_results = reranked_results[:rerank_top_k]
-        
-        return final_results
+        # 3. Fase 2: Reranking, já limitado aos top_k resultados finais
+        return await self._rerank_results(query, initial_results, rerank_top_k)
     
     async def _generate_embedding(self, text: str) -> List[float]:
         """
@@ -527,9 +1226,9 @@ class EnhancedRetriever:
         Returns:
             Lista de floats representando o embedding
         """
-        response = await self.openai_client.embeddings.create(
-            model=self.embedding_model,
-            input=text
+        response = await _call_openai(
+            self._openai_semaphore,
+            partial(self.openai_client.embeddings.create, model=self.embedding_model, input=text)
         )
         return response.data[0].embedding
     
@@ -541,7 +1240,7 @@ class EnhancedRetriever:
         top_k: int
     ) -> List[Dict[str, Any]]:
         """
-        Realiza a recuperação inicial baseada em similaridade vetorial.
+        Realiza a recuperação inicial por busca híbrida (BM25 + similaridade vetorial).
         
         Args:
             query: Consulta do usuário
@@ -552,95 +1251,124 @@ class EnhancedRetriever:
         Returns:
             Lista de resultados iniciais
         """
-        # Construir filtros para o Weaviate
+        # Construir filtros para o Weaviate: uma condição por campo filtrável,
+        # combinadas com And apenas quando houver mais de uma
+        operands = [
+            {"path": [field], "operator": "Equal", "valueText": filters[field]}
+            for field in _FILTERABLE_FIELDS
+            if filters and field in filters
+        ]
         where_filter = None
-        if filters:
-            where_filter = {}
-            
-            if "type" in filters:
-                where_filter = {
-                    "path": ["type"],
-                    "operator": "Equal",
-                    "valueString": filters["type"]
-                }
-            
-            if "category" in filters:
-                category_filter = {
-                    "path": ["category"],
-                    "operator": "Equal",
-                    "valueString": filters["category"]
-                }
-                
-                # Combinar filtros se necessário
-                if "type" in filters:
-                    where_filter = {
-                        "operator": "And",
-                        "operands": [where_filter, category_filter]
-                    }
-                else:
-                    where_filter = category_filter
+        if len(operands) == 1:
+            where_filter = operands[0]
+        elif operands:
+            where_filter = {"operator": "And", "operands": operands}
         
-        # Buscar chunks similares
-        response = self.vector_db.query.get(
+        # Buscar chunks similares (o cliente Weaviate é síncrono: executar fora do event loop).
+        # Os campos do documento pai são desnormalizados nos chunks na indexação,
+        # então uma única consulta traz tudo o que os resultados precisam.
+        query_builder = self.vector_db.query.get(
             self.chunk_class, 
-            ["text", "title", "document_id", "document_title", "position", "type", "category"]
-        ).with_near_vector({
-            "vector": query_embedding
-        }).with_where(where_filter).with_limit(top_k).with_additional(["score"]).do()
+            ["text", "title", "document_id", "document_title", "document_source", "position", "type", "category"]
+        ).with_hybrid(
+            query,
+            alpha=self.hybrid_alpha,
+            vector=query_embedding
+        ).with_limit(top_k).with_additional(["score", "vector"])
+        
+        if where_filter is not None:
+            query_builder = query_builder.with_where(where_filter)
+        
+        # Reranking no próprio Weaviate, na mesma consulta
+        if self.native_rerank:
+            query_builder = query_builder.with_additional(
+                ({"rerank": ["score"]}, {"property": "text", "query": query})
+            )
+            
+        response = await asyncio.to_thread(_run_graphql, self.vector_db, query_builder)
         
         # Extrair resultados
         results = []
         if "data" in response and "Get" in response["data"] and self.chunk_class in response["data"]["Get"]:
             chunks = response["data"]["Get"][self.chunk_class]
+            similarities = self._cosine_similarities(query_embedding, chunks)
             
-            for chunk in chunks:
-                # Buscar informações do documento pai
-                parent_doc = await self._get_parent_document(chunk["document_id"])
-                
-                results.append({
+            for chunk, similarity in zip(chunks, similarities):
+                additional = chunk.get("_additional") or {}
+                result = {
                     "text": chunk["text"],
-                    "title": chunk.get("title", ""),
-                    "document_title": chunk.get("document_title", parent_doc.get("title", "")),
-                    "document_source": parent_doc.get("source", ""),
-                    "type": chunk.get("type", parent_doc.get("type", "")),
-                    "category": chunk.get("category", parent_doc.get("category", "")),
+                    "title": chunk.get("title") or "",
+                    "document_title": chunk.get("document_title") or "",
+                    "document_source": chunk.get("document_source") or "",
+                    "type": chunk.get("type") or "",
+                    "category": chunk.get("category") or "",
                     "position": chunk.get("position", 0),
-                    "similarity_score": chunk.get("_additional", {}).get("score", 0)
-                })
+                    "similarity_score": float(similarity),
+                    # A busca híbrida retorna a pontuação como string
+                    "hybrid_score": float(additional.get("score") or 0),
+                    # Reaproveitado pelo seletor de contexto, que não precisa
+                    # gerar de novo o embedding dos chunks recuperados
+                    "embedding": additional.get("vector")
+                }
+                
+                if self.native_rerank:
+                    rerank = additional.get("rerank") or [{}]
+                    result["rerank_score"] = float(rerank[0].get("score") or 0) * 10
+                    
+                results.append(result)
         
         return results
     
-    async def _get_parent_document(self, doc_id: str) -> Dict[str, Any]:
+    def _cosine_similarities(
+        self,
+        query_embedding: List[float],
+        chunks: List[Dict[str, Any]]
+    ) -> np.ndarray:
         """
-        Busca informações do documento pai.
+        Calcula a similaridade de cosseno entre a consulta e os vetores dos chunks.
         
         Args:
-            doc_id: ID do documento
+            query_embedding: Embedding da consulta
+            chunks: Chunks retornados pelo Weaviate com _additional.vector
             
         Returns:
-            Informações do documento
+            Vetor de similaridades, na ordem dos chunks
         """
-        response = self.vector_db.query.get(
-            self.document_class, 
-            ["title", "summary", "source", "type", "category", "author"]
-        ).with_id(doc_id).do()
+        if not chunks:
+            return np.zeros(0, dtype=np.float32)
+            
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        chunk_vectors = [(chunk.get("_additional") or {}).get("vector") for chunk in chunks]
         
-        if "data" in response and "Get" in response["data"] and self.document_class in response["data"]["Get"]:
-            return response["data"]["Get"][self.document_class][0]
+        if any(vector is None or len(vector) != len(query_vector) for vector in chunk_vectors):
+            # Vetores ausentes (ex.: objetos sem vetor): sem similaridade disponível
+            return np.zeros(len(chunks), dtype=np.float32)
+            
+        # Matriz (n_chunks, dimensão) contígua para um único produto matriz-vetor
+        vectors = np.asarray(chunk_vectors, dtype=np.float32)
         
-        return {}
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector)
+        norms[norms == 0] = 1
+        
+        return (vectors @ query_vector) / norms
     
     async def _rerank_results(
         self, 
         query: str, 
-        initial_results: List[Dict[str, Any]]
+        initial_results: List[Dict[str, Any]],
+        top_k: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
-        Reordena os resultados usando LLM para melhorar a relevância.
+        Reordena os resultados para melhorar a relevância.
+        
+        Com native_rerank, usa as pontuações do módulo de rerank do Weaviate.
+        Senão, usa o cross-encoder quando disponível, pontuando todos os pares
+        (consulta, trecho) em uma única passada; caso contrário, usa o LLM.
         
         Args:
             query: Consulta do usuário
             initial_results: Resultados da recuperação inicial
+            top_k: Número máximo de resultados a retornar (None para todos)
             
         Returns:
             Resultados reordenados por relevância
@@ -649,6 +1377,92 @@ class EnhancedRetriever:
         if not initial_results:
             return []
         
+        if self.native_rerank:
+            # Pontuações já calculadas pelo Weaviate na recuperação inicial
+            scores = [result["rerank_score"] for result in initial_results]
+        else:
+            reranker = await self._get_reranker()
+            if reranker is not None:
+                pairs = [(query, result["text"]) for result in initial_results]
+                # Modelos com uma única saída retornam a relevância já normalizada (sigmoide) em 0-1
+                probabilities = await asyncio.to_thread(reranker.predict, pairs, batch_size=32)
+                scores = [float(p) * 10 for p in probabilities]
+            else:
+                scores = await self._llm_rerank_scores(query, initial_results)
+        
+        # Combinar com a pontuação de similaridade vetorial em uma operação vetorizada
+        rerank_scores = np.zeros(len(initial_results), dtype=np.float32)
+        rerank_scores[:len(scores)] = scores[:len(initial_results)]
+        similarities = np.fromiter(
+            (result["similarity_score"] for result in initial_results),
+            dtype=np.float32,
+            count=len(initial_results)
+        )
+        combined_scores = 0.3 * similarities + 0.7 * (rerank_scores / 10)
+        
+        # Ordenar por pontuação combinada (ordem estável em caso de empate)
+        order = np.argsort(-combined_scores, kind="stable")[:top_k]
+        
+        reranked_results = []
+        for i in order:
+            result = initial_results[i]
+            result["rerank_score"] = float(rerank_scores[i])
+            result["combined_score"] = float(combined_scores[i])
+            reranked_results.append(result)
+        
+        return reranked_results
+    
+    async def _get_reranker(self):
+        """
+        Carrega o cross-encoder de reranking na primeira utilização.
+        
+        Returns:
+            Modelo CrossEncoder ou None se não configurado ou indisponível
+        """
+        if self._reranker is not None or self.reranker_model is None:
+            return self._reranker
+            
+        async with self._reranker_lock:
+            if self._reranker is None and self.reranker_model is not None:
+                try:
+                    from sentence_transformers import CrossEncoder
+                except ImportError:
+                    # sentence-transformers é opcional: sem ele, o reranking usa o LLM
+                    logger.warning("sentence-transformers não instalado; reranking via LLM")
+                    self.reranker_model = None
+                    return None
+                    
+                try:
+                    self._reranker = await asyncio.to_thread(
+                        CrossEncoder, self.reranker_model, device=self.reranker_device
+                    )
+                except Exception:
+                    # Falha ao baixar ou carregar o modelo (sem rede, disco, modelo
+                    # inválido): não tentar de novo a cada consulta, usar o LLM
+                    logger.exception(
+                        "Falha ao carregar o cross-encoder %s; reranking via LLM",
+                        self.reranker_model
+                    )
+                    self.reranker_model = None
+                    return None
+                
+        return self._reranker
+    
+    async def _llm_rerank_scores(
+        self, 
+        query: str, 
+        initial_results: List[Dict[str, Any]]
+    ) -> List[float]:
+        """
+        Pontua a relevância dos resultados usando LLM.
+        
+        Args:
+            query: Consulta do usuário
+            initial_results: Resultados da recuperação inicial
+            
+        Returns:
+            Pontuações de 0 a 10, uma por resultado
+        """
         # Preparar prompt para o LLM
         prompt = f"""
         Avalie a relevância de cada trecho para a consulta: "{query}"
@@ -668,40 +1482,25 @@ class EnhancedRetriever:
             prompt += f"\n\nTrecho {i+1}:\n{result['text'][:300]}..."
         
         # Obter pontuações do LLM
-        response = await self.openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0
+        response = await _call_openai(
+            self._openai_semaphore,
+            partial(
+                self.openai_client.chat.completions.create,
+                model="gpt-4o",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0
+            )
         )
         
-        # Extrair pontuações
+        # Extrair pontuações, limitadas à escala de 0 a 10
         scores_text = response.choices[0].message.content.strip()
-        scores = []
-        
-        for line in scores_text.split('\n'):
-            try:
-                score = float(line.strip())
-                scores.append(score)
-            except ValueError:
-                # Ignorar linhas que não são números
-                pass
+        scores = [
+            min(float(score), 10.0) for score in _SCORE_PATTERN.findall(scores_text)
+        ][:len(initial_results)]
         
         # Garantir que temos pontuações para todos os resultados
         if len(scores) < len(initial_results):
             # Preencher com zeros se faltarem pontuações
             scores.extend([0] * (len(initial_results) - len(scores)))
         
-        # Combinar pontuações com resultados
-        for i, result in enumerate(initial_results):
-            if i < len(scores):
-                result["rerank_score"] = scores[i]
-                # Combinar com a pontuação de similaridade vetorial
-                result["combined_score"] = 0.3 * result["similarity_score"] + 0.7 * (scores[i] / 10)
-            else:
-                result["rerank_score"] = 0
-                result["combined_score"] = 0.3 * result["similarity_score"]
-        
-        # Ordenar por pontuação combinada
-        reranked_results = sorted(initial_results, key=lambda x: x["combined_score"], reverse=True)
-        
-        return reranked_results
+        return scores
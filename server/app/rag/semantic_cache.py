@@ -0,0 +1,174 @@
+"""
+Módulo de cache semântico para o Discovery RAG Agent V2.
+
+Este módulo implementa um cache LRU indexado por embeddings, permitindo reutilizar
+resultados de consultas semanticamente equivalentes sem repetir recuperação e
+geração.
+"""
+
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Set
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Cache LRU de resultados indexado por similaridade de embeddings.
+
+    Características:
+    - Buckets por projeções aleatórias (LSH) para localizar candidatos em O(1)
+    - Confirmação por similaridade de cosseno acima de um limiar
+    - Namespaces para separar resultados (ex.: por objetivo da consulta)
+    - Remoção do item menos recentemente usado ao atingir o tamanho máximo
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_size: int = 10000,
+        num_tables: int = 4,
+        num_planes: int = 8,
+        seed: int = 0
+    ):
+        """
+        Inicializa o cache semântico.
+
+        Args:
+            similarity_threshold: Similaridade de cosseno mínima para um acerto
+            max_size: Número máximo de entradas mantidas
+            num_tables: Número de tabelas LSH independentes
+            num_planes: Número de hiperplanos por tabela
+            seed: Semente para geração dos hiperplanos
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_size = max_size
+        self.num_tables = num_tables
+        self.num_planes = num_planes
+        self._rng = np.random.default_rng(seed)
+        self._planes: Optional[np.ndarray] = None  # Criados na primeira inserção
+        self._bit_weights = 1 << np.arange(num_planes)
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, Tuple[Tuple[str, int], ...], Any]]" = OrderedDict()
+        self._buckets: List[Dict[Tuple[str, int], Set[int]]] = [{} for _ in range(num_tables)]
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, embedding: List[float], namespace: str = "") -> Optional[Any]:
+        """
+        Busca um resultado armazenado para um embedding semelhante.
+
+        Args:
+            embedding: Embedding da consulta
+            namespace: Namespace do resultado
+
+        Returns:
+            Resultado armazenado ou None se não houver acerto
+        """
+        if self._planes is None:
+            return None
+
+        vector = self._normalize(embedding)
+
+        # Reunir candidatos de todas as tabelas
+        candidates = set()
+        for table, bucket_key in zip(self._buckets, self._bucket_keys(vector, namespace)):
+            candidates.update(table.get(bucket_key, ()))
+
+        if not candidates:
+            return None
+
+        # Confirmar pelo candidato mais similar
+        entry_ids = list(candidates)
+        vectors = np.stack([self._entries[entry_id][0] for entry_id in entry_ids])
+        similarities = vectors @ vector
+        best = int(np.argmax(similarities))
+
+        if similarities[best] < self.similarity_threshold:
+            return None
+
+        entry_id = entry_ids[best]
+        self._entries.move_to_end(entry_id)
+
+        return self._entries[entry_id][2]
+
+    def put(self, embedding: List[float], value: Any, namespace: str = "") -> None:
+        """
+        Armazena um resultado associado a um embedding.
+
+        Args:
+            embedding: Embedding da consulta
+            value: Resultado a armazenar
+            namespace: Namespace do resultado
+        """
+        vector = self._normalize(embedding)
+
+        if self._planes is None:
+            self._planes = self._rng.standard_normal(
+                (self.num_tables, self.num_planes, vector.shape[0])
+            ).astype(np.float32)
+
+        bucket_keys = self._bucket_keys(vector, namespace)
+        entry_id = self._next_id
+        self._next_id += 1
+
+        self._entries[entry_id] = (vector, bucket_keys, value)
+        for table, bucket_key in zip(self._buckets, bucket_keys):
+            table.setdefault(bucket_key, set()).add(entry_id)
+
+        # Remover entradas menos recentemente usadas
+        while len(self._entries) > self.max_size:
+            self._evict_oldest()
+
+    def clear(self) -> None:
+        """
+        Remove todas as entradas do cache.
+        """
+        self._entries.clear()
+        for table in self._buckets:
+            table.clear()
+
+    def _normalize(self, embedding: List[float]) -> np.ndarray:
+        """
+        Converte e normaliza um embedding para norma unitária.
+
+        Args:
+            embedding: Embedding original
+
+        Returns:
+            Vetor normalizado
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+
+        return vector / norm if norm else vector
+
+    def _bucket_keys(self, vector: np.ndarray, namespace: str) -> Tuple[Tuple[str, int], ...]:
+        """
+        Calcula a chave de bucket do vetor em cada tabela LSH.
+
+        Args:
+            vector: Vetor normalizado
+            namespace: Namespace do resultado
+
+        Returns:
+            Tupla com uma chave por tabela
+        """
+        bits = (self._planes @ vector) > 0
+        hashes = bits @ self._bit_weights
+
+        return tuple((namespace, int(h)) for h in hashes)
+
+    def _evict_oldest(self) -> None:
+        """
+        Remove a entrada menos recentemente usada.
+        """
+        entry_id, (_, bucket_keys, _) = self._entries.popitem(last=False)
+
+        for table, bucket_key in zip(self._buckets, bucket_keys):
+            bucket = table.get(bucket_key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del table[bucket_key]
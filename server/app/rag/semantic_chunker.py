@@ -5,10 +5,61 @@ Este módulo implementa técnicas avançadas de chunking semântico com tamanho
 e sobreposição para melhorar a qualidade da recuperação de informações.
 """
 
+import os
 import re
 import uuid
+import asyncio
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 import tiktoken
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+
+# Número máximo de bytes de um caractere em UTF-8
+_MAX_UTF8_BYTES_PER_CHAR = 4
+
+# Tokens da quebra entre dois parágrafos ("\n\n" é um único token nas
+# codificações do tiktoken)
+_PARAGRAPH_SEPARATOR_TOKENS = 1
+
+# Número máximo de textos com contagem de tokens em cache por chunker
+_TOKEN_COUNT_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(name: str) -> tiktoken.Encoding:
+    """
+    Carrega um tokenizador tiktoken uma única vez por processo.
+    
+    Args:
+        name: Nome da codificação (ex.: cl100k_base)
+        
+    Returns:
+        Tokenizador compartilhado entre as instâncias dos chunkers
+    """
+    return tiktoken.get_encoding(name)
+
+
+def _max_token_count(text: str) -> int:
+    """
+    Limite superior barato para o número de tokens de um texto.
+    
+    Cada token ocupa ao menos um byte em UTF-8, então o número de bytes limita o
+    de tokens. Texto ASCII (verificado sem percorrer a string) tem um byte por
+    caractere; nos demais, supõe-se o pior caso de bytes por caractere.
+    
+    Args:
+        text: Texto a ser avaliado
+        
+    Returns:
+        Número máximo de tokens que o texto pode ter
+    """
+    if text.isascii():
+        return len(text)
+    return len(text) * _MAX_UTF8_BYTES_PER_CHAR
 
 
 class SemanticChunker:
@@ -22,6 +73,25 @@ class SemanticChunker:
     - Preservação de metadados e contexto
     """
     
+    __slots__ = ("max_tokens", "overlap_tokens", "model", "tokenizer", "_token_counts")
+    
+    # Linhas de cabeçalho: Markdown (# Título), HTML (<h1>Título</h1>) e Markdown
+    # alternativo (Título seguido de uma linha === ou ---); o grupo que casou
+    # indica o tipo de cabeçalho
+    _HEADER_PATTERN = re.compile(
+        r"^#{1,6}[^\S\n]+(.+)$"
+        r"|^<h[1-6][^>\n]*>(.+?)</h[1-6]>.*$"
+        r"|^(.+)\n[=\-]{2,}[^\S\n]*$",
+        re.MULTILINE
+    )
+    
+    # Parágrafo: trecho sem espaços nas pontas e sem linha em branco no meio
+    _PARAGRAPH_PATTERN = re.compile(r"\S(?:[^\S\n]*(?:\n[^\S\n]*)?\S)*")
+    
+    # Fim de frase: pontuação final (e aspas ou parênteses de fechamento)
+    # seguida de espaço
+    _SENTENCE_END_PATTERN = re.compile(r"[.!?…][\"')\]]*(?=\s)")
+    
     def __init__(
         self, 
         max_tokens: int = 400, 
@@ -38,7 +108,71 @@ class SemanticChunker:
         """
         self.max_tokens = max_tokens
         self.overlap_tokens = overlap_tokens
-        self.tokenizer = tiktoken.get_encoding(model)
+        self.model = model
+        self.tokenizer = _get_encoding(model)
+        # Contagem de tokens por texto: parágrafos repetidos entre documentos
+        # (cabeçalhos, rodapés, avisos legais) são tokenizados uma única vez
+        self._token_counts: "OrderedDict[str, int]" = OrderedDict()
+        
+    def __getstate__(self) -> Dict[str, Any]:
+        # Enviar apenas a configuração para outros processos: o tokenizador é
+        # recarregado (uma vez por processo) e o cache de contagens recomeça vazio
+        return {
+            "max_tokens": self.max_tokens,
+            "overlap_tokens": self.overlap_tokens,
+            "model": self.model
+        }
+    
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.max_tokens = state["max_tokens"]
+        self.overlap_tokens = state["overlap_tokens"]
+        self.model = state["model"]
+        self.tokenizer = _get_encoding(self.model)
+        self._token_counts = OrderedDict()
+        
+    def chunk_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        max_workers: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Divide vários documentos em chunks em paralelo, um processo por núcleo.
+        
+        Args:
+            documents: Lista de documentos (ver chunk_document)
+            max_workers: Número de processos (padrão: número de núcleos)
+            
+        Returns:
+            Lista com os chunks de cada documento, na mesma ordem
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        
+        # Poucos documentos: o custo de iniciar os processos não compensa
+        if len(documents) < 2 or max_workers == 1:
+            return [self.chunk_document(document) for document in documents]
+            
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.chunk_document, documents, chunksize=8))
+    
+    async def chunk_document_async(
+        self,
+        document: Dict[str, Any],
+        executor: Optional[Executor] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Divide um documento em chunks fora do event loop.
+        
+        Args:
+            document: Documento a ser dividido (ver chunk_document)
+            executor: Executor a utilizar (ex.: um ProcessPoolExecutor compartilhado);
+                None usa o pool de threads padrão do event loop
+                
+        Returns:
+            Lista de chunks com metadados
+        """
+        loop = asyncio.get_running_loop()
+        
+        return await loop.run_in_executor(executor, self.chunk_document, document)
         
     def chunk_document(
         self, 
@@ -57,6 +191,25 @@ class SemanticChunker:
         Returns:
             Lista de chunks com metadados
         """
+        return list(self.iter_chunks(document))
+    
+    def iter_chunks(
+        self, 
+        document: Dict[str, Any]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Gera os chunks semânticos de um documento sob demanda.
+        
+        Os chunks enriquecidos são produzidos um a um, permitindo que o consumidor
+        (ex.: geração de embeddings) processe cada chunk enquanto os seguintes
+        ainda são montados.
+        
+        Args:
+            document: Documento a ser dividido (ver chunk_document)
+            
+        Yields:
+            Chunks com metadados, na ordem do documento
+        """
         # Extrair informações do documento
         doc_id = document.get("id", str(uuid.uuid4()))
         title = document.get("title", "")
@@ -66,16 +219,12 @@ class SemanticChunker:
         # Dividir o documento em seções
         sections = self._split_into_sections(title, content)
         
-        # Processar cada seção em chunks
-        all_chunks = []
-        for section_title, section_content in sections:
-            section_chunks = self._chunk_section(section_title, section_content)
-            all_chunks.extend(section_chunks)
+        # Processar cada seção em chunks; o total de chunks é necessário para a
+        # posição relativa, então apenas os pares (título, conteúdo) são reunidos
+        all_chunks = list(self._chunk_sections(sections))
             
         # Enriquecer chunks com metadados
-        enriched_chunks = self._enrich_chunks(all_chunks, doc_id, title, metadata)
-        
-        return enriched_chunks
+        yield from self._enrich_chunks(all_chunks, doc_id, title, metadata)
     
     def _split_into_sections(
         self, 
@@ -92,54 +241,25 @@ class SemanticChunker:
         Returns:
             Lista de tuplas (título_seção, conteúdo_seção)
         """
-        # Padrões para identificar cabeçalhos
-        section_patterns = [
-            r"^#{1,6}\s+(.+)$",              # Cabeçalhos Markdown (# Título)
-            r"^(.+)\n[=\-]{2,}$",            # Cabeçalhos alternativos Markdown (Título\n===)
-            r"<h[1-6][^>]*>(.+?)</h[1-6]>",  # Cabeçalhos HTML
-        ]
-        
-        # Combinar padrões em uma expressão regular
-        combined_pattern = "|".join(f"({pattern})" for pattern in section_patterns)
-        
-        # Dividir o conteúdo em linhas
-        lines = content.split("\n")
-        
-        # Inicializar seções
+        # Percorrer os cabeçalhos em uma única busca sobre o conteúdo; o corpo de
+        # cada seção é o trecho entre o fim da linha de um cabeçalho e o início
+        # do seguinte
         sections = []
         current_section_title = title
-        current_section_content = []
+        body_start = 0
         
-        # Processar cada linha
-        for line in lines:
-            # Verificar se a linha é um cabeçalho
-            is_header = False
-            header_title = None
-            
-            for pattern in section_patterns:
-                match = re.match(pattern, line)
-                if match:
-                    is_header = True
-                    header_title = match.group(1)
-                    break
-            
-            if is_header and header_title:
-                # Finalizar seção atual
-                if current_section_content:
-                    section_content = "\n".join(current_section_content)
-                    sections.append((current_section_title, section_content))
+        for match in self._HEADER_PATTERN.finditer(content):
+            # Finalizar seção atual se houver linhas antes do cabeçalho
+            if match.start() > body_start:
+                sections.append((current_section_title, content[body_start:match.start() - 1]))
                 
-                # Iniciar nova seção
-                current_section_title = header_title
-                current_section_content = []
-            else:
-                # Adicionar linha à seção atual
-                current_section_content.append(line)
+            # Iniciar nova seção após a quebra de linha do cabeçalho
+            current_section_title = next(group for group in match.groups() if group)
+            body_start = match.end() + 1
         
         # Adicionar última seção
-        if current_section_content:
-            section_content = "\n".join(current_section_content)
-            sections.append((current_section_title, section_content))
+        if body_start <= len(content):
+            sections.append((current_section_title, content[body_start:]))
         
         # Se não houver seções, usar o documento inteiro como uma seção
         if not sections:
@@ -147,62 +267,197 @@ class SemanticChunker:
             
         return sections
     
+    def _chunk_sections(
+        self, 
+        sections: List[Tuple[str, str]]
+    ) -> Iterator[Dict[str, str]]:
+        """
+        Divide as seções de um documento em chunks respeitando o limite de tokens.
+        
+        A tokenização é feita em uma única chamada para o documento inteiro, sobre
+        os parágrafos das seções que podem exceder o limite; o tamanho dessas
+        seções é obtido das contagens dos parágrafos, sem tokenizá-las de novo.
+        
+        Args:
+            sections: Lista de tuplas (título_seção, conteúdo_seção)
+            
+        Yields:
+            Chunks das seções, na ordem do documento
+        """
+        # Seções pequenas o suficiente são mantidas inteiras. Cada token ocupa
+        # ao menos um byte, então seções curtas dispensam a tokenização.
+        # As demais são divididas em parágrafos, representados por suas posições
+        # no texto de origem: cada chunk é extraído com um único fatiamento
+        split_sections = {
+            i: self._split_into_paragraphs(section_content)
+            for i, (_, section_content) in enumerate(sections)
+            if _max_token_count(section_content) > self.max_tokens
+        }
+        
+        # Contar os tokens dos parágrafos de todas essas seções de uma só vez
+        paragraph_lens = iter(self._count_tokens([
+            source[start:end]
+            for source, spans in split_sections.values()
+            for start, end in spans
+        ]))
+        
+        for i, (section_title, section_content) in enumerate(sections):
+            if i in split_sections:
+                source, spans = split_sections[i]
+                section_paragraph_lens = list(islice(paragraph_lens, len(spans)))
+                
+                # Tamanho da seção: seus parágrafos mais as quebras entre eles
+                section_len = (
+                    sum(section_paragraph_lens)
+                    + _PARAGRAPH_SEPARATOR_TOKENS * max(len(spans) - 1, 0)
+                )
+                if section_len > self.max_tokens:
+                    yield from self._chunk_section(
+                        section_title, source, spans, section_paragraph_lens
+                    )
+                    continue
+                    
+            yield {"title": section_title, "content": section_content}
+    
     def _chunk_section(
         self, 
         section_title: str, 
-        section_content: str
-    ) -> List[Dict[str, str]]:
+        source: str,
+        spans: List[Tuple[int, int]],
+        paragraph_lens: List[int]
+    ) -> Iterator[Dict[str, str]]:
         """
-        Divide uma seção em chunks respeitando o limite de tokens.
+        Agrupa os parágrafos de uma seção em chunks respeitando o limite de tokens.
         
         Args:
             section_title: Título da seção
-            section_content: Conteúdo da seção
+            source: Texto de origem dos parágrafos (ver _split_into_paragraphs)
+            spans: Posições (início, fim) de cada parágrafo em source
+            paragraph_lens: Número de tokens de cada parágrafo
             
-        Returns:
-            Lista de chunks da seção
+        Yields:
+            Chunks da seção
         """
-        # Tokenizar o conteúdo
-        tokens = self.tokenizer.encode(section_content)
-        
-        # Se a seção for pequena o suficiente, mantê-la inteira
-        if len(tokens) <= self.max_tokens:
-            return [{"title": section_title, "content": section_content}]
-        
-        # Dividir em parágrafos
-        paragraphs = self._split_into_paragraphs(section_content)
-        
-        # Agrupar parágrafos em chunks respeitando o limite de tokens
-        chunks = []
-        current_chunk = []
+        # Agrupar parágrafos em chunks respeitando o limite de tokens. O chunk
+        # atual é o intervalo de parágrafos de first até o parágrafo corrente,
+        # então a janela de sobreposição avança sem copiar listas
+        first = 0  # Índice do primeiro parágrafo do chunk atual
         current_tokens = 0
         
-        for para in paragraphs:
-            para_tokens = self.tokenizer.encode(para)
-            
+        for i, para_len in enumerate(paragraph_lens):
+            # Parágrafo maior que o limite: dividi-lo por tokens em chunks próprios
+            if para_len > self.max_tokens:
+                if i > first:
+                    chunk_content = source[spans[first][0]:spans[i - 1][1]]
+                    yield {"title": section_title, "content": chunk_content}
+                    
+                start, end = spans[i]
+                for piece in self._split_long_paragraph(source[start:end]):
+                    yield {"title": section_title, "content": piece}
+                    
+                first = i + 1
+                current_tokens = 0
+                continue
+                
             # Se adicionar este parágrafo exceder o limite
-            if current_tokens + len(para_tokens) > self.max_tokens and current_chunk:
+            if current_tokens + para_len > self.max_tokens and i > first:
                 # Finalizar o chunk atual
-                chunk_content = "\n\n".join(current_chunk)
-                chunks.append({"title": section_title, "content": chunk_content})
+                chunk_content = source[spans[first][0]:spans[i - 1][1]]
+                yield {"title": section_title, "content": chunk_content}
                 
-                # Iniciar novo chunk com sobreposição
-                overlap_start = max(0, len(current_chunk) - 1)
-                current_chunk = current_chunk[overlap_start:]
-                current_tokens = sum(len(self.tokenizer.encode(p)) for p in current_chunk)
+                # Iniciar novo chunk com sobreposição do último parágrafo, se
+                # ele e o parágrafo atual couberem juntos no limite
+                if paragraph_lens[i - 1] + para_len <= self.max_tokens:
+                    first = i - 1
+                    current_tokens = paragraph_lens[first]
+                else:
+                    first = i
+                    current_tokens = 0
             
             # Adicionar parágrafo ao chunk atual
-            current_chunk.append(para)
-            current_tokens += len(para_tokens)
+            current_tokens += para_len
         
         # Adicionar o último chunk se não estiver vazio
-        if current_chunk:
-            chunk_content = "\n\n".join(current_chunk)
-            chunks.append({"title": section_title, "content": chunk_content})
+        if first < len(spans):
+            chunk_content = source[spans[first][0]:spans[-1][1]]
+            yield {"title": section_title, "content": chunk_content}
+    
+    def _split_long_paragraph(self, text: str) -> Iterator[str]:
+        """
+        Divide um parágrafo maior que o limite em trechos de até max_tokens tokens.
+        
+        Cada trecho termina, quando possível, no fim da última frase da segunda
+        metade da sua janela de tokens, e o trecho seguinte começa overlap_tokens
+        tokens antes desse fim (no máximo metade do trecho).
+        
+        Args:
+            text: Parágrafo a ser dividido
+            
+        Yields:
+            Trechos do parágrafo
+        """
+        tokens = self.tokenizer.encode(text)
+        # Posição no texto do início de cada token, para localizar por busca
+        # binária o token em que termina uma frase
+        _, offsets = self.tokenizer.decode_with_offsets(tokens)
+        total = len(tokens)
+        
+        start = 0
+        while True:
+            end = min(start + self.max_tokens, total)
             
-        return chunks
+            if end < total:
+                # Recuar o fim da janela até o fim da última frase encontrado
+                sentence_end = None
+                for match in self._SENTENCE_END_PATTERN.finditer(
+                    text, offsets[(start + end) // 2], offsets[end]
+                ):
+                    sentence_end = match.end()
+                    
+                if sentence_end is not None:
+                    end = bisect_left(offsets, sentence_end, start + 1, end)
+            
+            piece = text[offsets[start]:offsets[end] if end < total else len(text)].strip()
+            if piece:
+                yield piece
+                
+            if end >= total:
+                return
+                
+            # A sobreposição nunca recua mais que metade do trecho emitido
+            start = max(end - self.overlap_tokens, (start + end + 1) // 2)
     
-    def _split_into_paragraphs(self, text: str) -> List[str]:
+    def _count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        Conta os tokens de vários textos, reaproveitando contagens em cache.
+        
+        Os textos sem cache são tokenizados em uma única chamada (paralelizada
+        pelo tiktoken).
+        
+        Args:
+            texts: Textos a serem contados
+            
+        Returns:
+            Número de tokens de cada texto, na mesma ordem
+        """
+        missing = list({text: None for text in texts if text not in self._token_counts})
+        
+        if missing:
+            for text, tokens in zip(missing, self.tokenizer.encode_batch(missing)):
+                self._token_counts[text] = len(tokens)
+                
+        counts = []
+        for text in texts:
+            self._token_counts.move_to_end(text)
+            counts.append(self._token_counts[text])
+            
+        # Remover contagens menos recentemente usadas
+        while len(self._token_counts) > _TOKEN_COUNT_CACHE_SIZE:
+            self._token_counts.popitem(last=False)
+            
+        return counts
+    
+    def _split_into_paragraphs(self, text: str) -> Tuple[str, List[Tuple[int, int]]]:
         """
         Divide o texto em parágrafos.
         
@@ -210,13 +465,11 @@ class SemanticChunker:
             text: Texto a ser dividido
             
         Returns:
-            Lista de parágrafos
+            Tupla (texto de origem, posições (início, fim) de cada parágrafo nele)
         """
-        # Dividir por quebras de linha duplas ou outros separadores de parágrafo
-        paragraphs = re.split(r"\n\s*\n", text)
-        
-        # Filtrar parágrafos vazios
-        return [p.strip() for p in paragraphs if p.strip()]
+        # Parágrafos separados por quebras de linha duplas ou outros separadores,
+        # sem espaços nas pontas; parágrafos vazios não casam com o padrão
+        return text, [match.span() for match in self._PARAGRAPH_PATTERN.finditer(text)]
     
     def _enrich_chunks(
         self, 
@@ -224,7 +477,7 @@ class SemanticChunker:
         doc_id: str,
         doc_title: str,
         metadata: Dict[str, Any]
-    ) -> List[Dict[str, Any]]:
+    ) -> Iterator[Dict[str, Any]]:
         """
         Adiciona metadados e IDs aos chunks.
         
@@ -234,31 +487,28 @@ class SemanticChunker:
             doc_title: Título do documento original
             metadata: Metadados adicionais do documento
             
-        Returns:
-            Lista de chunks enriquecidos com metadados
+        Yields:
+            Chunks enriquecidos com metadados
         """
-        enriched_chunks = []
+        total_chunks = len(chunks)
+        position_step = 1.0 / total_chunks if total_chunks else 0.0
         
         for i, chunk in enumerate(chunks):
             # Gerar ID único para o chunk
             chunk_id = f"{doc_id}_chunk_{i}"
             
-            # Criar metadados do chunk
+            # Criar metadados do chunk sobre os metadados do documento; os campos
+            # do chunk prevalecem em caso de conflito
             chunk_metadata = {
+                **(metadata or {}),
                 "chunk_id": chunk_id,
                 "document_id": doc_id,
                 "document_title": doc_title,
                 "section_title": chunk["title"],
-                "position": i / len(chunks),  # Posição relativa no documento
-                "total_chunks": len(chunks)
+                "position": i * position_step,  # Posição relativa no documento
+                "total_chunks": total_chunks
             }
             
-            # Adicionar metadados do documento
-            if metadata:
-                for key, value in metadata.items():
-                    if key not in chunk_metadata:
-                        chunk_metadata[key] = value
-            
             # Criar chunk enriquecido
             enriched_chunk = {
                 "id": chunk_id,
@@ -266,9 +516,7 @@ class SemanticChunker:
                 "metadata": chunk_metadata
             }
             
-            enriched_chunks.append(enriched_chunk)
-            
-        return enriched_chunks
+            yield enriched_chunk
 
 
 class MarkdownChunker(SemanticChunker):
@@ -276,6 +524,11 @@ class MarkdownChunker(SemanticChunker):
     Versão especializada do chunker semântico otimizada para documentos Markdown.
     """
     
+    __slots__ = ()
+    
+    # Linha de cabeçalho Markdown: nível (# = 1, ## = 2, etc.) e título
+    _MARKDOWN_HEADER_PATTERN = re.compile(r"^(#{1,6})[^\S\n]+(.+)$", re.MULTILINE)
+    
     def _split_into_sections(
         self, 
         title: str, 
@@ -291,45 +544,46 @@ class MarkdownChunker(SemanticChunker):
         Returns:
             Lista de tuplas (título_seção, conteúdo_seção)
         """
-        # Padrão para cabeçalhos Markdown
-        header_pattern = r"^(#{1,6})\s+(.+)$"
-        
-        # Dividir o conteúdo em linhas
-        lines = content.split("\n")
+        # Padronizar quebras de linha \r\n e \r para \n
+        text = content
+        if "\r" in text:
+            text = "\n".join(text.splitlines()) + "\n"
         
         # Inicializar seções
         sections = []
         current_level = 0
         current_title = title
-        current_content = []
-        
-        # Processar cada linha
-        for line in lines:
-            # Verificar se a linha é um cabeçalho
-            match = re.match(header_pattern, line)
-            
-            if match:
-                # Nível do cabeçalho (# = 1, ## = 2, etc.)
-                level = len(match.group(1))
-                header_title = match.group(2)
+        current_content = []  # Trechos de uma ou mais linhas da seção atual
+        body_start = 0  # Início das linhas após o último cabeçalho
+        
+        # Percorrer apenas os cabeçalhos, em uma única busca sobre o conteúdo
+        for match in self._MARKDOWN_HEADER_PATTERN.finditer(text):
+            # Adicionar à seção atual as linhas entre o cabeçalho anterior e este
+            if match.start() > body_start:
+                current_content.append(text[body_start:match.start() - 1])
                 
-                # Finalizar seção atual se não estiver vazia
-                if current_content and (level <= current_level or current_level == 0):
-                    section_content = "\n".join(current_content)
-                    sections.append((current_title, section_content))
-                    current_content = []
-                
-                # Atualizar título e nível da seção atual
-                current_title = header_title
-                current_level = level
-            else:
-                # Adicionar linha à seção atual
-                current_content.append(line)
+            # Nível do cabeçalho (# = 1, ## = 2, etc.)
+            level = len(match.group(1))
+            header_title = match.group(2)
+            
+            # Finalizar seção atual se não estiver vazia
+            if current_content and (level <= current_level or current_level == 0):
+                sections.append((current_title, "\n".join(current_content)))
+                current_content = []
+            
+            # Atualizar título e nível da seção atual
+            current_title = header_title
+            current_level = level
+            body_start = match.end() + 1
+        
+        # Adicionar as linhas após o último cabeçalho, sem a quebra de linha final
+        if body_start < len(text):
+            tail = text[body_start:]
+            current_content.append(tail[:-1] if tail.endswith("\n") else tail)
         
         # Adicionar última seção
         if current_content:
-            section_content = "\n".join(current_content)
-            sections.append((current_title, section_content))
+            sections.append((current_title, "\n".join(current_content)))
         
         # Se não houver seções, usar o documento inteiro como uma seção
         if not sections:
@@ -343,7 +597,12 @@ class PDFChunker(SemanticChunker):
     Versão especializada do chunker semântico otimizada para conteúdo extraído de PDFs.
     """
     
-    def _split_into_paragraphs(self, text: str) -> List[str]:
+    __slots__ = ()
+    
+    # Item de lista numerada (ex.: "1. Texto")
+    _NUM_ITEM_RE = re.compile(r"^\d+\.\s")
+    
+    def _split_into_paragraphs(self, text: str) -> Tuple[str, List[Tuple[int, int]]]:
         """
         Divide o texto extraído de PDF em parágrafos, lidando com quebras de linha.
         
@@ -351,22 +610,24 @@ class PDFChunker(SemanticChunker):
             text: Texto extraído de PDF
             
         Returns:
-            Lista de parágrafos
+            Tupla (parágrafos reconstruídos unidos por linhas em branco,
+            posições (início, fim) de cada parágrafo nesse texto)
         """
-        # Normalizar quebras de linha
-        normalized = re.sub(r"\r\n", "\n", text)
-        
         # Identificar quebras de parágrafo (linha em branco ou indentação)
         paragraphs = []
         current_para = []
         
-        lines = normalized.split("\n")
+        # splitlines já trata \r\n, \r e quebras de página (\f) do texto extraído
+        lines = text.splitlines()
+        num_item_match = self._NUM_ITEM_RE.match
         for i, line in enumerate(lines):
+            stripped = line.strip()
+            
             # Verificar se é uma quebra de parágrafo
             is_break = (
-                not line.strip() or  # Linha vazia
+                not stripped or  # Linha vazia
                 (i > 0 and line.startswith("    ") and not lines[i-1].endswith(".")) or  # Indentação
-                (i > 0 and re.match(r"^\d+\.\s", line))  # Item numerado
+                (i > 0 and num_item_match(line))  # Item numerado
             )
             
             if is_break and current_para:
@@ -375,19 +636,25 @@ class PDFChunker(SemanticChunker):
                 current_para = []
                 
                 # Adicionar linha atual se não for vazia
-                if line.strip():
-                    current_para.append(line.strip())
+                if stripped:
+                    current_para.append(stripped)
             else:
-                # Adicionar ao parágrafo atual
-                if line.strip():
-                    # Verificar se deve juntar com a linha anterior
-                    if current_para and not current_para[-1].endswith("."):
-                        current_para[-1] = current_para[-1] + " " + line.strip()
-                    else:
-                        current_para.append(line.strip())
+                # Adicionar ao parágrafo atual; as linhas são unidas por espaço
+                # uma única vez ao finalizar o parágrafo
+                if stripped:
+                    current_para.append(stripped)
         
         # Adicionar último parágrafo
         if current_para:
             paragraphs.append(" ".join(current_para))
         
-        return paragraphs
+        # Os parágrafos reconstruídos não existem no texto original: uni-los uma
+        # única vez e localizar cada um no texto resultante
+        spans = []
+        start = 0
+        for paragraph in paragraphs:
+            end = start + len(paragraph)
+            spans.append((start, end))
+            start = end + 2
+        
+        return "\n\n".join(paragraphs), spans
@@ -5,10 +5,433 @@ Este módulo implementa templates de prompts otimizados para diferentes objetivo
 de consulta, maximizando a relevância e qualidade das respostas.
 """
 
-from typing import List, Dict, Any, Optional
+import hashlib
+import re
+import sys
+import textwrap
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Any, Iterable, Iterator, Mapping, Optional, Tuple, Union
 import json
 
 
+class Objective(IntEnum):
+    """
+    Objetivos de consulta suportados. O valor de cada membro indexa as tabelas
+    por objetivo do módulo.
+    """
+    
+    INFORMATIVE = 0
+    HYPOTHESIS = 1
+    BENCHMARK = 2
+    OBJECTIVES = 3
+
+
+# Nomes dos objetivos usados pela API e nas respostas, indexados por Objective
+_OBJECTIVE_NAMES = tuple(sys.intern(objective.name.lower()) for objective in Objective)
+
+# Objetivo correspondente a cada nome
+_NAME_TO_OBJECTIVE: Mapping[str, Objective] = MappingProxyType(
+    {name: objective for name, objective in zip(_OBJECTIVE_NAMES, Objective)}
+)
+
+
+def _resolve_objective(objective: Union[str, Objective, None]) -> Optional[Objective]:
+    """
+    Converte o objetivo recebido pela API pública em Objective.
+    
+    Args:
+        objective: Nome do objetivo ou membro de Objective
+        
+    Returns:
+        Objective correspondente, ou None se o objetivo for desconhecido
+    """
+    if isinstance(objective, Objective):
+        return objective
+    return _NAME_TO_OBJECTIVE.get(objective)
+
+
+# Placeholders da parte variável dos templates de prompt
+_PLACEHOLDERS = ("query", "context")
+
+# Marcador do início da parte variável dos templates de prompt
+_CONTEXT_MARKER = "# Contexto"
+
+# Blocos do contexto formatado: (cabeçalho, chave no dicionário de contexto), na
+# ordem em que aparecem no prompt
+_CONTEXT_SECTIONS = (
+    ("## Informações Recuperadas\n\n", "compressed_chunks"),
+    ("## Diretrizes de Produto\n\n", "compressed_product_guidelines"),
+    ("## Diretrizes de Design\n\n", "compressed_design_guidelines"),
+    ("## Benchmarks e Boas Práticas\n\n", "compressed_benchmarks"),
+    ("## Objetivos do Time\n\n", "compressed_team_objectives")
+)
+
+# Número de prompts montados mantidos em memória
+_PROMPT_CACHE_SIZE = 512
+
+# Número de respostas formatadas para a interface mantidas em memória
+_FORMATTED_RESPONSE_CACHE_SIZE = 256
+
+
+def _objective_config(*section_keys: str) -> Dict[str, Any]:
+    """
+    Monta a configuração de seções de um objetivo.
+    
+    Args:
+        section_keys: Chaves das seções esperadas, na ordem de exibição
+        
+    Returns:
+        Dicionário com a ordem ("order") e o conjunto ("expected") das seções
+    """
+    order = tuple(sys.intern(key) for key in section_keys)
+    return {"order": order, "expected": frozenset(order)}
+
+
+# Seções esperadas na resposta, indexadas por Objective: "order" lista as chaves
+# na ordem de exibição e "expected" é o conjunto usado na validação de formato. As
+# chaves são internadas, assim como as extraídas das respostas, para que as
+# buscas nos dicionários de seções se resolvam por identidade
+_OBJECTIVE_CONFIG: Tuple[Dict[str, Any], ...] = (
+    # Objective.INFORMATIVE
+    _objective_config(
+        "resumo", "detalhes", "fontes", "lacunas_de_informação"
+    ),
+    # Objective.HYPOTHESIS
+    _objective_config(
+        "resumo_da_hipótese", "pontos_fortes", "considerações_e_riscos",
+        "alinhamento_com_diretrizes", "recomendações"
+    ),
+    # Objective.BENCHMARK
+    _objective_config(
+        "resumo_comparativo", "análise_de_mercado", "alinhamento_com_boas_práticas",
+        "oportunidades_de_diferenciação", "recomendações"
+    ),
+    # Objective.OBJECTIVES
+    _objective_config(
+        "resumo_de_alinhamento", "análise_por_objetivo", "impacto_potencial_em_kpis",
+        "oportunidades_de_fortalecimento", "recomendações"
+    )
+)
+
+# Metadados específicos por objetivo, indexados por Objective: pares (campo dos
+# metadados, seção cuja presença o campo indica)
+_OBJECTIVE_METADATA: Tuple[Tuple[Tuple[str, str], ...], ...] = (
+    # Objective.INFORMATIVE
+    (),
+    # Objective.HYPOTHESIS
+    (
+        ("has_risks", "considerações_e_riscos"),
+        ("has_alignment", "alinhamento_com_diretrizes")
+    ),
+    # Objective.BENCHMARK
+    (
+        ("has_market_analysis", "análise_de_mercado"),
+        ("has_differentiation", "oportunidades_de_diferenciação")
+    ),
+    # Objective.OBJECTIVES
+    (
+        ("has_kpi_impact", "impacto_potencial_em_kpis"),
+        ("has_objective_analysis", "análise_por_objetivo")
+    )
+)
+
+# Títulos formatados das seções conhecidas
+_SECTION_TITLES: Dict[str, str] = {
+    "resumo": "Resumo",
+    "detalhes": "Detalhes",
+    "fontes": "Fontes",
+    "lacunas_de_informação": "Lacunas de Informação",
+    "resumo_da_hipótese": "Resumo da Hipótese",
+    "pontos_fortes": "Pontos Fortes",
+    "considerações_e_riscos": "Considerações e Riscos",
+    "alinhamento_com_diretrizes": "Alinhamento com Diretrizes",
+    "recomendações": "Recomendações",
+    "resumo_comparativo": "Resumo Comparativo",
+    "análise_de_mercado": "Análise de Mercado",
+    "alinhamento_com_boas_práticas": "Alinhamento com Boas Práticas",
+    "oportunidades_de_diferenciação": "Oportunidades de Diferenciação",
+    "resumo_de_alinhamento": "Resumo de Alinhamento",
+    "análise_por_objetivo": "Análise por Objetivo",
+    "impacto_potencial_em_kpis": "Impacto Potencial em KPIs",
+    "oportunidades_de_fortalecimento": "Oportunidades de Fortalecimento"
+}
+
+
+# Papel do agente, compartilhado por todos os objetivos e incluído uma única vez
+# no início de cada prompt de sistema
+_SYSTEM_PREFIX = (
+    "Você é um agente especialista em Discovery e Ideação de Produto, "
+    "atuando como copiloto para designers e PMs."
+)
+
+# Templates de prompt por objetivo, com os placeholders {context},
+# {response_format} e {query}. A indentação do código-fonte é removida na
+# importação para não ser enviada ao LLM como tokens de espaço, e as instruções
+# são escritas em linhas corridas para reduzir os tokens processados no prefill.
+# Tudo o que antecede "# Contexto" é fixo por objetivo e forma um prefixo
+# idêntico entre requisições, reaproveitado pelo cache de prefixo do provedor do
+# LLM; o contexto formatado já termina com uma linha em branco
+
+# Template para consultas informativas
+_INFORMATIVE_TEMPLATE = textwrap.dedent("""
+    Objetivo: fornecer informações precisas com base no conhecimento disponível, sem especulações.
+    
+    # Instruções
+    
+    Responda APENAS com as informações do contexto: seja factual, cite as fontes, não especule e indique claramente o que não estiver disponível. Use linguagem simples, direta e organizada.
+    
+    # Formato da Resposta
+    
+    {response_format}
+    
+    # Contexto
+    
+    {context}# Consulta do Usuário
+    
+    {query}
+    """).strip()
+
+# Template para avaliação de hipóteses
+_HYPOTHESIS_TEMPLATE = textwrap.dedent("""
+    Objetivo: avaliar criticamente hipóteses de produto, identificando pontos fortes, riscos e alinhamento com diretrizes.
+    
+    # Instruções
+    
+    Avalie a hipótese quanto ao alinhamento com as diretrizes de produto e design, à consistência com o que se sabe de usuários e mercado, aos riscos de implementação e às oportunidades de refinamento. Seja equilibrado, baseado em evidências do contexto e construtivo.
+    
+    # Formato da Resposta
+    
+    {response_format}
+    
+    # Contexto
+    
+    {context}# Hipótese do Usuário
+    
+    {query}
+    """).strip()
+
+# Template para consultas de benchmark
+_BENCHMARK_TEMPLATE = textwrap.dedent("""
+    Objetivo: comparar ideias e soluções com benchmarks e boas práticas do mercado.
+    
+    # Instruções
+    
+    Compare a consulta com os benchmarks disponíveis: padrões e tendências de mercado, soluções similares de concorrentes, alinhamento com boas práticas de design e produto e oportunidades de diferenciação. Seja objetivo e específico, com insights acionáveis, considerando aspectos positivos e negativos.
+    
+    # Formato da Resposta
+    
+    {response_format}
+    
+    # Contexto
+    
+    {context}# Consulta do Usuário
+    
+    {query}
+    """).strip()
+
+# Template para consultas relacionadas a objetivos do time
+_OBJECTIVES_TEMPLATE = textwrap.dedent("""
+    Objetivo: avaliar o alinhamento de ideias e propostas com os objetivos estratégicos do time.
+    
+    # Instruções
+    
+    Avalie as conexões diretas e indiretas da consulta com os objetivos do time, o impacto potencial nos KPIs, o alinhamento com a visão de produto e design e as oportunidades de fortalecê-lo. Relacione aspectos concretos, quantifique quando possível, sugira ajustes e considere o curto e o longo prazo.
+    
+    # Formato da Resposta
+    
+    {response_format}
+    
+    # Contexto
+    
+    {context}# Consulta do Usuário
+    
+    {query}
+    """).strip()
+
+# Formatos de resposta por objetivo, inseridos no placeholder {response_format}
+
+# Formato de resposta para consultas informativas
+_INFORMATIVE_FORMAT = textwrap.dedent("""
+    Estruture sua resposta da seguinte forma:
+    
+    ## Resumo
+    [Breve resumo das principais informações encontradas]
+    
+    ## Detalhes
+    [Informações detalhadas organizadas por tópicos relevantes]
+    
+    ## Fontes
+    [Lista das fontes específicas utilizadas, indicando de onde cada informação foi extraída]
+    
+    ## Lacunas de Informação
+    [Aspectos da consulta que não puderam ser respondidos com o contexto disponível]
+    """).strip()
+
+# Formato de resposta para avaliação de hipóteses
+_HYPOTHESIS_FORMAT = textwrap.dedent("""
+    Estruture sua resposta da seguinte forma:
+    
+    ## Resumo da Hipótese
+    [Breve resumo da hipótese avaliada]
+    
+    ## Pontos Fortes
+    [Lista dos aspectos positivos e alinhados com diretrizes]
+    
+    ## Considerações e Riscos
+    [Lista de potenciais desafios, riscos ou pontos de atenção]
+    
+    ## Alinhamento com Diretrizes
+    [Análise do alinhamento com diretrizes de produto e design]
+    
+    ## Recomendações
+    [Sugestões concretas para refinar ou melhorar a hipótese]
+    """).strip()
+
+# Formato de resposta para consultas de benchmark
+_BENCHMARK_FORMAT = textwrap.dedent("""
+    Estruture sua resposta da seguinte forma:
+    
+    ## Resumo Comparativo
+    [Visão geral da comparação com benchmarks]
+    
+    ## Análise de Mercado
+    [Comparação com soluções similares e tendências relevantes]
+    
+    ## Alinhamento com Boas Práticas
+    [Avaliação do alinhamento com práticas recomendadas]
+    
+    ## Oportunidades de Diferenciação
+    [Identificação de espaços para inovação e diferenciação]
+    
+    ## Recomendações
+    [Sugestões concretas baseadas na análise de benchmark]
+    """).strip()
+
+# Formato de resposta para consultas relacionadas a objetivos
+_OBJECTIVES_FORMAT = textwrap.dedent("""
+    Estruture sua resposta da seguinte forma:
+    
+    ## Resumo de Alinhamento
+    [Visão geral do alinhamento com objetivos do time]
+    
+    ## Análise por Objetivo
+    [Avaliação detalhada do alinhamento com cada objetivo relevante]
+    
+    ## Impacto Potencial em KPIs
+    [Análise do possível impacto nos indicadores-chave]
+    
+    ## Oportunidades de Fortalecimento
+    [Sugestões para aumentar o alinhamento estratégico]
+    
+    ## Recomendações
+    [Próximos passos recomendados com base na análise]
+    """).strip()
+
+
+def _compile_template(template: str, response_format: str) -> Tuple[str, str]:
+    """
+    Separa um template em prefixo estático e parte variável.
+    
+    Args:
+        template: Template com os placeholders {response_format}, {context} e {query}
+        response_format: Formato de resposta do objetivo
+        
+    Returns:
+        Par (prefixo estático, string de formatação da parte variável). O prefixo
+        inclui _SYSTEM_PREFIX e o formato de resposta; a parte variável é
+        preenchida com str.format_map em uma única passada
+    """
+    static, marker, variable = template.partition(_CONTEXT_MARKER)
+    static = f"{_SYSTEM_PREFIX}\n\n{static}".replace("{response_format}", response_format)
+    
+    # Escapar chaves literais e restaurar apenas os placeholders conhecidos, para
+    # que format_map nunca encontre um campo desconhecido
+    variable = (marker + variable).replace("{", "{{").replace("}", "}}")
+    for name in _PLACEHOLDERS:
+        variable = variable.replace("{{" + name + "}}", "{" + name + "}")
+    return static.rstrip(), variable
+
+
+@lru_cache(maxsize=_FORMATTED_RESPONSE_CACHE_SIZE)
+def _format_sections(
+    objective: Optional[Objective],
+    sections: Tuple[Tuple[str, str], ...]
+) -> str:
+    """
+    Formata as seções de uma resposta para a interface.
+    
+    Args:
+        objective: Objetivo da consulta (None se desconhecido)
+        sections: Pares (chave_seção, conteúdo_seção), na ordem da resposta
+        
+    Returns:
+        Resposta formatada
+    """
+    parts = []
+    
+    # Adicionar seções na ordem correta
+    if objective is not None:
+        config = _OBJECTIVE_CONFIG[objective]
+        contents = dict(sections)
+        items = [
+            (section_key, contents[section_key])
+            for section_key in config["order"]
+            if section_key in contents
+        ]
+    else:
+        # Fallback: adicionar todas as seções
+        items = sections
+        
+    for section_key, content in items:
+        title = _SECTION_TITLES.get(section_key, section_key.replace("_", " ").title())
+        parts.extend((f"## {title}\n\n", content, "\n\n"))
+    
+    return "".join(parts).strip()
+
+
+@dataclass(slots=True, frozen=True)
+class Prompt:
+    """
+    Prompt especializado pronto para envio ao LLM.
+    
+    O prompt de sistema é mantido em duas partes: adaptadores de provedores que
+    exigem marcação explícita de cache podem marcar static_prefix, enquanto
+    messages envia o texto completo, como a API da OpenAI espera (ela já
+    reaproveita prefixos idênticos automaticamente).
+    
+    Attributes:
+        static_prefix: Início do prompt de sistema, fixo por objetivo (papel,
+            instruções e formato da resposta)
+        system: Restante do prompt de sistema (contexto e consulta)
+        query: Consulta do usuário
+        objective: Objetivo da consulta
+        response_format: Formato de resposta esperado para o objetivo
+    """
+    
+    static_prefix: str
+    system: str
+    query: str
+    objective: Objective
+    response_format: str
+    
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        """
+        Mensagens no formato da API de chat, montadas apenas quando solicitadas.
+        
+        Returns:
+            Mensagens de sistema e do usuário
+        """
+        return [
+            {"role": "system", "content": f"{self.static_prefix}\n\n{self.system}"},
+            {"role": "user", "content": self.query}
+        ]
+
+
 class SpecializedPromptManager:
     """
     Gerencia prompts especializados por objetivo de consulta.
@@ -20,403 +443,128 @@ class SpecializedPromptManager:
     - Instruções específicas por tipo de consulta
     """
     
-    def __init__(self):
+    # Templates de formatação de resposta, indexados por Objective
+    response_formats: Tuple[str, ...] = (
+        _INFORMATIVE_FORMAT,
+        _HYPOTHESIS_FORMAT,
+        _BENCHMARK_FORMAT,
+        _OBJECTIVES_FORMAT
+    )
+    
+    # Templates de prompts, indexados por Objective, pré-compilados uma única vez
+    # em (prefixo estático, parte variável) e compartilhados por todas as instâncias
+    prompt_templates: Tuple[Tuple[str, str], ...] = tuple(
+        _compile_template(template, response_format)
+        for template, response_format in zip(
+            (_INFORMATIVE_TEMPLATE, _HYPOTHESIS_TEMPLATE, _BENCHMARK_TEMPLATE, _OBJECTIVES_TEMPLATE),
+            response_formats
+        )
+    )
+    
+    def __init__(self) -> None:
         """
         Inicializa o gerenciador de prompts especializados.
         """
-        # Carregar templates de prompts
-        self.prompt_templates = {
-            "informative": self._get_informative_template(),
-            "hypothesis": self._get_hypothesis_template(),
-            "benchmark": self._get_benchmark_template(),
-            "objectives": self._get_objectives_template()
-        }
-        
-        # Carregar templates de formatação de resposta
-        self.response_formats = {
-            "informative": self._get_informative_format(),
-            "hypothesis": self._get_hypothesis_format(),
-            "benchmark": self._get_benchmark_format(),
-            "objectives": self._get_objectives_format()
-        }
+        # Partes variáveis dos prompts montados por (objetivo, consulta, contexto):
+        # consultas repetidas reaproveitam o prompt sem reformatar o contexto
+        self._prompts: "OrderedDict[bytes, str]" = OrderedDict()
     
     def create_prompt(
         self, 
         query: str, 
         context: Dict[str, Any], 
-        objective: Optional[str] = None
-    ) -> Dict[str, Any]:
+        objective: Union[str, Objective, None] = None
+    ) -> Prompt:
         """
         Cria um prompt especializado para a consulta.
         
         Args:
             query: Consulta do usuário
             context: Contexto selecionado
-            objective: Objetivo da consulta (opcional)
+            objective: Nome do objetivo ou Objective (opcional)
             
         Returns:
-            Prompt completo com mensagens formatadas
+            Prompt completo; as mensagens para a API ficam em Prompt.messages
         """
-        # Determinar objetivo se não for fornecido
-        if not objective:
-            objective = "informative"  # Fallback para informativo
-        
-        # Garantir que o objetivo é válido
-        if objective not in self.prompt_templates:
-            objective = "informative"
+        # Objetivo ausente ou desconhecido: fallback para informativo
+        objective = _resolve_objective(objective)
+        if objective is None:
+            objective = Objective.INFORMATIVE
         
         # Obter template para o objetivo
-        template = self.prompt_templates[objective]
+        static_prefix, template = self.prompt_templates[objective]
         
         # Obter formato de resposta para o objetivo
         response_format = self.response_formats[objective]
         
-        # Extrair componentes do contexto
-        chunks = context.get("compressed_chunks", "")
-        product_guidelines = context.get("compressed_product_guidelines", "")
-        design_guidelines = context.get("compressed_design_guidelines", "")
-        benchmarks = context.get("compressed_benchmarks", "")
-        team_objectives = context.get("compressed_team_objectives", "")
-        
-        # Construir o contexto formatado
-        formatted_context = self._format_context(
-            chunks,
-            product_guidelines,
-            design_guidelines,
-            benchmarks,
-            team_objectives,
-            objective
+        # Extrair os componentes não vazios do contexto, uma única vez
+        context_pairs = tuple(
+            (header, content)
+            for header, content in (
+                (header, context.get(key)) for header, key in _CONTEXT_SECTIONS
+            )
+            if content
         )
         
-        # Substituir placeholders no template
-        prompt = template.replace("{query}", query)
-        prompt = prompt.replace("{context}", formatted_context)
-        prompt = prompt.replace("{response_format}", response_format)
+        cache_key = self._prompt_cache_key(objective, query, context_pairs)
+        prompt = self._prompts.get(cache_key)
         
-        # Construir mensagens para a API
-        messages = [
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": query}
-        ]
+        if prompt is not None:
+            self._prompts.move_to_end(cache_key)
+        else:
+            # Construir o contexto formatado
+            formatted_context = self._format_context(context_pairs)
+            
+            # Substituir placeholders da parte variável em uma única passada
+            prompt = template.format_map({"query": query, "context": formatted_context})
+            
+            self._prompts[cache_key] = prompt
+            if len(self._prompts) > _PROMPT_CACHE_SIZE:
+                self._prompts.popitem(last=False)
         
-        return {
-            "messages": messages,
-            "objective": objective,
-            "response_format": response_format
-        }
+        # As mensagens para a API são montadas sob demanda por Prompt.messages
+        return Prompt(static_prefix, prompt, query, objective, response_format)
     
-    def _format_context(
+    def _prompt_cache_key(
         self,
-        chunks: str,
-        product_guidelines: str,
-        design_guidelines: str,
-        benchmarks: str,
-        team_objectives: str,
-        objective: str
-    ) -> str:
+        objective: Objective,
+        query: str,
+        context_pairs: Tuple[Tuple[str, str], ...]
+    ) -> bytes:
         """
-        Formata o contexto para o prompt.
+        Gera a chave de cache de um prompt a partir do seu conteúdo.
         
         Args:
-            chunks: Chunks recuperados
-            product_guidelines: Diretrizes de produto
-            design_guidelines: Diretrizes de design
-            benchmarks: Benchmarks
-            team_objectives: Objetivos do time
             objective: Objetivo da consulta
+            query: Consulta do usuário
+            context_pairs: Pares (cabeçalho, conteúdo) não vazios do contexto
             
         Returns:
-            Contexto formatado
-        """
-        formatted_context = ""
-        
-        # Adicionar chunks recuperados
-        if chunks:
-            formatted_context += "## Informações Recuperadas\n\n"
-            formatted_context += chunks
-            formatted_context += "\n\n"
-        
-        # Adicionar diretrizes de produto
-        if product_guidelines:
-            formatted_context += "## Diretrizes de Produto\n\n"
-            formatted_context += product_guidelines
-            formatted_context += "\n\n"
-        
-        # Adicionar diretrizes de design
-        if design_guidelines:
-            formatted_context += "## Diretrizes de Design\n\n"
-            formatted_context += design_guidelines
-            formatted_context += "\n\n"
-        
-        # Adicionar benchmarks
-        if benchmarks:
-            formatted_context += "## Benchmarks e Boas Práticas\n\n"
-            formatted_context += benchmarks
-            formatted_context += "\n\n"
-        
-        # Adicionar objetivos do time
-        if team_objectives:
-            formatted_context += "## Objetivos do Time\n\n"
-            formatted_context += team_objectives
-            formatted_context += "\n\n"
-        
-        return formatted_context
-    
-    def _get_informative_template(self) -> str:
-        """
-        Template para consultas informativas.
-        
-        Returns:
-            Template de prompt
-        """
-        return """
-        Você é um agente especialista em Discovery e Ideação de Produto, atuando como copiloto para designers e PMs.
-        
-        Seu objetivo é fornecer informações precisas e detalhadas com base no conhecimento disponível, sem especulações.
-        
-        # Contexto
-        
-        {context}
-        
-        # Instruções
-        
-        Responda à consulta do usuário utilizando APENAS as informações fornecidas no contexto acima.
-        
-        - Seja factual e objetivo, citando as fontes específicas das informações
-        - Não especule além do que está explicitamente mencionado no contexto
-        - Se o contexto não contiver informações suficientes, indique claramente o que não está disponível
-        - Estruture sua resposta de forma clara e organizada
-        - Use linguagem simples e direta
-        
-        # Formato da Resposta
-        
-        {response_format}
-        
-        # Consulta do Usuário
-        
-        {query}
-        """
-    
-    def _get_hypothesis_template(self) -> str:
-        """
-        Template para avaliação de hipóteses.
-        
-        Returns:
-            Template de prompt
-        """
-        return """
-        Você é um agente especialista em Discovery e Ideação de Produto, atuando como copiloto para designers e PMs.
-        
-        Seu objetivo é avaliar criticamente hipóteses de produto, identificando pontos fortes, riscos e alinhamento com diretrizes.
-        
-        # Contexto
-        
-        {context}
-        
-        # Instruções
-        
-        Avalie a hipótese do usuário considerando:
-        
-        - Alinhamento com as diretrizes de produto e design
-        - Consistência com as informações disponíveis sobre usuários e mercado
-        - Potenciais riscos e desafios de implementação
-        - Oportunidades de melhoria ou refinamento
-        
-        Sua análise deve ser:
-        - Equilibrada, apresentando tanto pontos positivos quanto negativos
-        - Baseada em evidências do contexto, não em opiniões pessoais
-        - Construtiva, oferecendo sugestões de melhoria quando apropriado
-        - Estruturada de forma clara, com seções bem definidas
-        
-        # Formato da Resposta
-        
-        {response_format}
-        
-        # Hipótese do Usuário
-        
-        {query}
-        """
-    
-    def _get_benchmark_template(self) -> str:
-        """
-        Template para consultas de benchmark.
-        
-        Returns:
-            Template de prompt
-        """
-        return """
-        Você é um agente especialista em Discovery e Ideação de Produto, atuando como copiloto para designers e PMs.
-        
-        Seu objetivo é comparar ideias e soluções com benchmarks e boas práticas do mercado.
-        
-        # Contexto
-        
-        {context}
-        
-        # Instruções
-        
-        Compare a consulta do usuário com os benchmarks e boas práticas disponíveis:
-        
-        - Identifique padrões e tendências relevantes no mercado
-        - Compare com soluções similares de concorrentes ou referências
-        - Avalie o alinhamento com as melhores práticas de design e produto
-        - Destaque oportunidades de diferenciação e inovação
-        
-        Sua análise deve:
-        - Ser objetiva e baseada em fatos do contexto
-        - Apresentar comparações claras e específicas
-        - Oferecer insights acionáveis
-        - Considerar tanto aspectos positivos quanto negativos
-        
-        # Formato da Resposta
-        
-        {response_format}
-        
-        # Consulta do Usuário
-        
-        {query}
-        """
-    
-    def _get_objectives_template(self) -> str:
-        """
-        Template para consultas relacionadas a objetivos do time.
-        
-        Returns:
-            Template de prompt
-        """
-        return """
-        Você é um agente especialista em Discovery e Ideação de Produto, atuando como copiloto para designers e PMs.
-        
-        Seu objetivo é avaliar o alinhamento de ideias e propostas com os objetivos estratégicos do time.
-        
-        # Contexto
-        
-        {context}
-        
-        # Instruções
-        
-        Avalie como a consulta do usuário se alinha aos objetivos do time:
-        
-        - Identifique conexões diretas e indiretas com os objetivos estratégicos
-        - Avalie o potencial impacto nos indicadores-chave de desempenho (KPIs)
-        - Considere o alinhamento com a visão de produto e design
-        - Destaque oportunidades para fortalecer o alinhamento estratégico
-        
-        Sua análise deve:
-        - Ser específica, relacionando aspectos da consulta a objetivos concretos
-        - Quantificar o alinhamento quando possível
-        - Sugerir ajustes para melhorar o alinhamento estratégico
-        - Considerar tanto benefícios de curto quanto de longo prazo
-        
-        # Formato da Resposta
-        
-        {response_format}
-        
-        # Consulta do Usuário
-        
-        {query}
-        """
-    
-    def _get_informative_format(self) -> str:
-        """
-        Formato de resposta para consultas informativas.
-        
-        Returns:
-            Template de formato
-        """
-        return """
-        Estruture sua resposta da seguinte forma:
-        
-        ## Resumo
-        [Breve resumo das principais informações encontradas]
-        
-        ## Detalhes
-        [Informações detalhadas organizadas por tópicos relevantes]
-        
-        ## Fontes
-        [Lista das fontes específicas utilizadas, indicando de onde cada informação foi extraída]
-        
-        ## Lacunas de Informação
-        [Aspectos da consulta que não puderam ser respondidos com o contexto disponível]
-        """
-    
-    def _get_hypothesis_format(self) -> str:
-        """
-        Formato de resposta para avaliação de hipóteses.
-        
-        Returns:
-            Template de formato
-        """
-        return """
-        Estruture sua resposta da seguinte forma:
-        
-        ## Resumo da Hipótese
-        [Breve resumo da hipótese avaliada]
-        
-        ## Pontos Fortes
-        [Lista dos aspectos positivos e alinhados com diretrizes]
-        
-        ## Considerações e Riscos
-        [Lista de potenciais desafios, riscos ou pontos de atenção]
-        
-        ## Alinhamento com Diretrizes
-        [Análise do alinhamento com diretrizes de produto e design]
-        
-        ## Recomendações
-        [Sugestões concretas para refinar ou melhorar a hipótese]
-        """
-    
-    def _get_benchmark_format(self) -> str:
-        """
-        Formato de resposta para consultas de benchmark.
-        
-        Returns:
-            Template de formato
-        """
-        return """
-        Estruture sua resposta da seguinte forma:
-        
-        ## Resumo Comparativo
-        [Visão geral da comparação com benchmarks]
-        
-        ## Análise de Mercado
-        [Comparação com soluções similares e tendências relevantes]
-        
-        ## Alinhamento com Boas Práticas
-        [Avaliação do alinhamento com práticas recomendadas]
-        
-        ## Oportunidades de Diferenciação
-        [Identificação de espaços para inovação e diferenciação]
-        
-        ## Recomendações
-        [Sugestões concretas baseadas na análise de benchmark]
+            Digest de 16 bytes identificando o prompt
         """
+        digest = hashlib.blake2b(f"{objective:d}\x00{query}\x00".encode(), digest_size=16)
+        for header, content in context_pairs:
+            digest.update(f"{header}\x00{len(content)}\x00".encode())
+            digest.update(content.encode())
+            
+        return digest.digest()
     
-    def _get_objectives_format(self) -> str:
+    def _format_context(self, context_pairs: Tuple[Tuple[str, str], ...]) -> str:
         """
-        Formato de resposta para consultas relacionadas a objetivos.
+        Formata o contexto para o prompt.
         
+        Args:
+            context_pairs: Pares (cabeçalho, conteúdo) não vazios do contexto
+            
         Returns:
-            Template de formato
-        """
-        return """
-        Estruture sua resposta da seguinte forma:
-        
-        ## Resumo de Alinhamento
-        [Visão geral do alinhamento com objetivos do time]
-        
-        ## Análise por Objetivo
-        [Avaliação detalhada do alinhamento com cada objetivo relevante]
-        
-        ## Impacto Potencial em KPIs
-        [Análise do possível impacto nos indicadores-chave]
-        
-        ## Oportunidades de Fortalecimento
-        [Sugestões para aumentar o alinhamento estratégico]
-        
-        ## Recomendações
-        [Próximos passos recomendados com base na análise]
+            Contexto formatado
         """
+        return "".join(f"{header}{content}\n\n" for header, content in context_pairs)
+
+
+# Gerenciador compartilhado pela aplicação: os templates são globais e o cache de
+# prompts montados é aproveitado por todas as requisições
+MANAGER = SpecializedPromptManager()
 
 
 class ResponseProcessor:
@@ -429,32 +577,44 @@ class ResponseProcessor:
     - Formatação consistente para a interface
     """
     
+    # Linha de cabeçalho de seção ("## Título")
+    _SECTION_HEADER_PATTERN = re.compile(r"^## (.*)$", re.MULTILINE)
+    
+    # Linha de cabeçalho já terminada, em uma resposta recebida em streaming
+    _STREAM_HEADER_PATTERN = re.compile(r"^## (.*)\n", re.MULTILINE)
+    
     def process_response(
         self, 
         response: str, 
-        objective: str
+        objective: Union[str, Objective]
     ) -> Dict[str, Any]:
         """
         Processa a resposta do LLM.
         
         Args:
             response: Resposta bruta do LLM
-            objective: Objetivo da consulta
+            objective: Nome do objetivo da consulta ou Objective
             
         Returns:
             Resposta processada com metadados
         """
+        # Converter o objetivo uma única vez; nas saídas ele é sempre reportado
+        # pelo nome, e objetivos desconhecidos são mantidos como recebidos
+        resolved = _resolve_objective(objective)
+        if resolved is not None:
+            objective = _OBJECTIVE_NAMES[resolved]
+        
         # Extrair seções da resposta
         sections = self._extract_sections(response)
         
         # Validar conformidade com o formato esperado
-        is_compliant = self._validate_format(sections, objective)
+        is_compliant = self._validate_format(sections, resolved)
         
         # Extrair insights e metadados
-        metadata = self._extract_metadata(sections, objective)
+        metadata = self._extract_metadata(sections, resolved, objective)
         
         # Formatar para a interface
-        formatted_response = self._format_for_interface(sections, objective)
+        formatted_response = self._format_for_interface(sections, resolved)
         
         return {
             "response": formatted_response,
@@ -464,6 +624,71 @@ class ResponseProcessor:
             "sections": sections
         }
     
+    def process_responses(
+        self, 
+        items: Iterable[Tuple[str, Union[str, Objective]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Processa em lote as respostas de várias consultas.
+        
+        Args:
+            items: Pares (resposta bruta do LLM, objetivo da consulta)
+            
+        Returns:
+            Respostas processadas com metadados, na mesma ordem
+        """
+        # O processamento é limitado pelo GIL (regex e dicionários), então um
+        # único laço com o método já resolvido supera a distribuição em threads
+        process = self.process_response
+        
+        return [process(response, objective) for response, objective in items]
+    
+    def process_stream(self, fragments: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """
+        Extrai as seções de uma resposta recebida em streaming.
+        
+        Cada seção é emitida assim que o cabeçalho da seção seguinte (ou o fim da
+        resposta) é recebido, sem esperar a resposta completa. As seções emitidas
+        são as mesmas de _extract_sections.
+        
+        Args:
+            fragments: Fragmentos de texto da resposta, na ordem em que chegam
+            
+        Yields:
+            Pares (chave_seção, conteúdo_seção)
+        """
+        current_section = None  # Nenhuma seção antes do primeiro cabeçalho
+        buffer = ""  # Texto recebido desde o início da seção atual
+        scan_from = 0  # Início da primeira linha de buffer ainda não verificada
+        
+        for fragment in fragments:
+            buffer += fragment
+            
+            # Procurar apenas linhas de cabeçalho completas; o conteúdo da seção
+            # é o trecho do buffer antes do cabeçalho
+            match = self._STREAM_HEADER_PATTERN.search(buffer, scan_from)
+            while match is not None:
+                # Finalizar seção atual se houver linhas antes do cabeçalho; o
+                # texto antes do primeiro cabeçalho (preâmbulo) é descartado
+                if match.start() > 0 and current_section is not None:
+                    yield current_section, buffer[:match.start()].strip()
+                    
+                # Iniciar nova seção
+                current_section = sys.intern(match.group(1).strip().lower().replace(" ", "_"))
+                buffer = buffer[match.end():]
+                match = self._STREAM_HEADER_PATTERN.search(buffer)
+                
+            scan_from = buffer.rfind("\n") + 1
+        
+        # A última linha termina com a resposta e pode ser um cabeçalho
+        if current_section is None:
+            return
+        if buffer.startswith("## ", scan_from):
+            if scan_from > 0:
+                yield current_section, buffer[:scan_from].strip()
+        else:
+            yield current_section, buffer.strip()
+    
     def _extract_sections(self, response: str) -> Dict[str, str]:
         """
         Extrai seções da resposta.
@@ -475,85 +700,60 @@ class ResponseProcessor:
             Dicionário com seções extraídas
         """
         sections = {}
-        current_section = "preamble"
-        current_content = []
-        
-        # Dividir por linhas
-        lines = response.split("\n")
-        
-        for line in lines:
-            # Verificar se é um cabeçalho de seção
-            if line.startswith("## "):
-                # Finalizar seção atual
-                if current_content:
-                    sections[current_section] = "\n".join(current_content).strip()
-                    current_content = []
-                
-                # Iniciar nova seção
-                current_section = line[3:].strip().lower().replace(" ", "_")
-            else:
-                # Adicionar à seção atual
-                current_content.append(line)
+        matches = list(self._SECTION_HEADER_PATTERN.finditer(response))
         
-        # Adicionar última seção
-        if current_content:
-            sections[current_section] = "\n".join(current_content).strip()
+        # O conteúdo de cada seção vai do fim do seu cabeçalho ao início do
+        # seguinte; o texto antes do primeiro cabeçalho (preâmbulo) é descartado
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(response) + 1
+            
+            # Seções sem nenhuma linha de conteúdo são ignoradas
+            if end > match.end() + 1:
+                section_key = sys.intern(match.group(1).strip().lower().replace(" ", "_"))
+                sections[section_key] = response[match.end():end].strip()
         
         return sections
     
     def _validate_format(
         self, 
         sections: Dict[str, str], 
-        objective: str
+        objective: Optional[Objective]
     ) -> bool:
         """
         Valida se a resposta segue o formato esperado.
         
         Args:
             sections: Seções extraídas
-            objective: Objetivo da consulta
+            objective: Objetivo da consulta (None se desconhecido)
             
         Returns:
             True se estiver em conformidade, False caso contrário
         """
-        # Definir seções esperadas por objetivo
-        expected_sections = {
-            "informative": ["resumo", "detalhes", "fontes", "lacunas_de_informação"],
-            "hypothesis": ["resumo_da_hipótese", "pontos_fortes", "considerações_e_riscos", 
-                          "alinhamento_com_diretrizes", "recomendações"],
-            "benchmark": ["resumo_comparativo", "análise_de_mercado", 
-                         "alinhamento_com_boas_práticas", "oportunidades_de_diferenciação", 
-                         "recomendações"],
-            "objectives": ["resumo_de_alinhamento", "análise_por_objetivo", 
-                          "impacto_potencial_em_kpis", "oportunidades_de_fortalecimento", 
-                          "recomendações"]
-        }
-        
         # Verificar se todas as seções esperadas estão presentes
-        if objective in expected_sections:
-            for section in expected_sections[objective]:
-                if section not in sections:
-                    return False
+        if objective is not None:
+            return sections.keys() >= _OBJECTIVE_CONFIG[objective]["expected"]
         
         return True
     
     def _extract_metadata(
         self, 
         sections: Dict[str, str], 
-        objective: str
+        objective: Optional[Objective],
+        objective_name: str
     ) -> Dict[str, Any]:
         """
         Extrai metadados e insights da resposta.
         
         Args:
             sections: Seções extraídas
-            objective: Objetivo da consulta
+            objective: Objetivo da consulta (None se desconhecido)
+            objective_name: Nome do objetivo reportado nos metadados
             
         Returns:
             Metadados extraídos
         """
         metadata = {
-            "objective": objective,
+            "objective": objective_name,
             "sections_count": len(sections),
             "has_recommendations": "recomendações" in sections,
             "sources_cited": "fontes" in sections,
@@ -561,87 +761,27 @@ class ResponseProcessor:
         }
         
         # Extrair metadados específicos por objetivo
-        if objective == "hypothesis":
-            metadata["has_risks"] = "considerações_e_riscos" in sections
-            metadata["has_alignment"] = "alinhamento_com_diretrizes" in sections
-        
-        elif objective == "benchmark":
-            metadata["has_market_analysis"] = "análise_de_mercado" in sections
-            metadata["has_differentiation"] = "oportunidades_de_diferenciação" in sections
-        
-        elif objective == "objectives":
-            metadata["has_kpi_impact"] = "impacto_potencial_em_kpis" in sections
-            metadata["has_objective_analysis"] = "análise_por_objetivo" in sections
+        if objective is not None:
+            for field, section_key in _OBJECTIVE_METADATA[objective]:
+                metadata[field] = section_key in sections
         
         return metadata
     
     def _format_for_interface(
         self, 
         sections: Dict[str, str], 
-        objective: str
+        objective: Optional[Objective]
     ) -> str:
         """
         Formata a resposta para a interface.
         
         Args:
             sections: Seções extraídas
-            objective: Objetivo da consulta
+            objective: Objetivo da consulta (None se desconhecido)
             
         Returns:
             Resposta formatada
         """
-        # Definir ordem das seções por objetivo
-        section_order = {
-            "informative": ["resumo", "detalhes", "fontes", "lacunas_de_informação"],
-            "hypothesis": ["resumo_da_hipótese", "pontos_fortes", "considerações_e_riscos", 
-                          "alinhamento_com_diretrizes", "recomendações"],
-            "benchmark": ["resumo_comparativo", "análise_de_mercado", 
-                         "alinhamento_com_boas_práticas", "oportunidades_de_diferenciação", 
-                         "recomendações"],
-            "objectives": ["resumo_de_alinhamento", "análise_por_objetivo", 
-                          "impacto_potencial_em_kpis", "oportunidades_de_fortalecimento", 
-                          "recomendações"]
-        }
-        
-        # Títulos formatados para as seções
-        section_titles = {
-            "resumo": "Resumo",
-            "detalhes": "Detalhes",
-            "fontes": "Fontes",
-            "lacunas_de_informação": "Lacunas de Informação",
-            "resumo_da_hipótese": "Resumo da Hipótese",
-            "pontos_fortes": "Pontos Fortes",
-            "considerações_e_riscos": "Considerações e Riscos",
-            "alinhamento_com_diretrizes": "Alinhamento com Diretrizes",
-            "recomendações": "Recomendações",
-            "resumo_comparativo": "Resumo Comparativo",
-            "análise_de_mercado": "Análise de Mercado",
-            "alinhamento_com_boas_práticas": "Alinhamento com Boas Práticas",
-            "oportunidades_de_diferenciação": "Oportunidades de Diferenciação",
-            "resumo_de_alinhamento": "Resumo de Alinhamento",
-            "análise_por_objetivo": "Análise por Objetivo",
-            "impacto_potencial_em_kpis": "Impacto Potencial em KPIs",
-            "oportunidades_de_fortalecimento": "Oportunidades de Fortalecimento"
-        }
-        
-        # Construir resposta formatada
-        formatted_response = ""
-        
-        # Adicionar seções na ordem correta
-        if objective in section_order:
-            for section_key in section_order[objective]:
-                if section_key in sections:
-                    title = section_titles.get(section_key, section_key.replace("_", " ").title())
-                    formatted_response += f"## {title}\n\n"
-                    formatted_response += sections[section_key]
-                    formatted_response += "\n\n"
-        else:
-            # Fallback: adicionar todas as seções
-            for section_key, content in sections.items():
-                if section_key != "preamble":  # Ignorar preâmbulo
-                    title = section_titles.get(section_key, section_key.replace("_", " ").title())
-                    formatted_response += f"## {title}\n\n"
-                    formatted_response += content
-                    formatted_response += "\n\n"
-        
-        return formatted_response.strip()
+        # Respostas estruturadas idênticas (ex.: respostas padrão de "sem
+        # informação") reaproveitam a formatação anterior
+        return _format_sections(objective, tuple(sections.items()))
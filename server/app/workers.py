@@ -0,0 +1,58 @@
+"""
+Worker de tarefas para o Discovery RAG Agent V2.
+
+Este módulo define as tarefas executadas fora dos processos da API, via Arq,
+para que os workers HTTP atendam apenas requisições. Para iniciar o worker:
+
+    cd server && arq app.workers.WorkerSettings
+"""
+
+import os
+from typing import Dict, Any
+
+from arq.connections import RedisSettings
+
+from app.api.flow_store import create_flow_store
+from app.api.flow_simulation import simulate_flow_processing
+
+
+# Redis compartilhado com a API: fila de tarefas e estado das simulações
+REDIS_URL = os.getenv("REDIS_URL")
+if not REDIS_URL:
+    raise RuntimeError(
+        "REDIS_URL não configurada: o worker de tarefas usa o mesmo Redis da API "
+        "(ENABLE_TASK_QUEUE=true) e não pode iniciar sem ele"
+    )
+
+
+async def run_flow(ctx: Dict[str, Any], simulation_id: str, query: str, objective: str) -> None:
+    """
+    Executa uma simulação de fluxo enfileirada pela API.
+    """
+    await simulate_flow_processing(ctx["flow_store"], simulation_id, query, objective)
+
+
+async def startup(ctx: Dict[str, Any]) -> None:
+    """
+    Conecta o worker ao armazenamento de simulações compartilhado com a API.
+    """
+    ctx["flow_store"] = create_flow_store(REDIS_URL)
+
+
+async def shutdown(ctx: Dict[str, Any]) -> None:
+    """
+    Libera as conexões do worker.
+    """
+    await ctx["flow_store"].close()
+
+
+class WorkerSettings:
+    """
+    Configuração do worker Arq.
+    """
+    functions = [run_flow]
+    on_startup = startup
+    on_shutdown = shutdown
+    redis_settings = RedisSettings.from_dsn(REDIS_URL)
+    # Cada simulação passa a maior parte do tempo aguardando entre etapas
+    max_jobs = 100